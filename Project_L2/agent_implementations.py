@@ -1,11 +1,25 @@
 import asyncio
-import json
 import logging
 import os
-from typing import Any, Dict, List, Optional, Tuple
-
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Annotated, Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import aiohttp
+import orjson
 import requests
+import xxhash
+from cachetools import LRUCache, TTLCache
 from chromadb.api import Collection
+from chromadb.api.types import EmbeddingFunction
+from pydantic import BaseModel, Discriminator, Tag, TypeAdapter, ValidationError
+from requests.adapters import HTTPAdapter
+from sentence_transformers import SentenceTransformer
+
+from json_utils import extract_json_object
 
 # Configure logging
 logging.basicConfig(
@@ -13,43 +27,415 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Bound once so the router's hot parse path skips the attribute lookup
+_loads = orjson.loads
+
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Order and account IDs, matched together so a query is scanned only once
+_ID_RE = re.compile(r"(ORD|ACC)-\d+")
+
+# Pricing-related keywords; case-insensitive so the query isn't lowercased
+_PRICE_RE = re.compile(r"pric(?:e|ing)|cost", re.I)
+
+# Numbers (IDs, error codes, quantities) barely move a query's embedding but
+# change its answer, so queries containing them skip the semantic cache
+_DIGIT_RE = re.compile(r"\d")
+
+# Punctuation dropped when matching queries against FAQ questions
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
+# Errors behind the apology replies LLMUtils returns instead of raising. The
+# orchestrator binds a fresh list per query; tasks and threads spawned for the
+# query copy the context, so they append to the same list
+_llm_failures: ContextVar[Optional[List[Exception]]] = ContextVar(
+    "_llm_failures", default=None
+)
+
+
+def _dumps(obj: Any) -> str:
+    """orjson-backed serializer for aiohttp request bodies"""
+    return orjson.dumps(obj).decode()
+
+
+
+def _normalize_question(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace for FAQ matching"""
+    return " ".join(_PUNCTUATION_RE.sub(" ", text.lower()).split())
+
+
+def _extract_ids(query: str) -> Tuple[Optional[str], Optional[str]]:
+    """Return the first order ID and the first account ID found in the query"""
+    order_id = None
+    account_id = None
+    for match in _ID_RE.finditer(query):
+        if match.group(1) == "ORD":
+            order_id = order_id or match.group(0)
+        else:
+            account_id = account_id or match.group(0)
+        if order_id and account_id:
+            break
+    return order_id, account_id
+
 
 # LLM utilities
 class LLMUtils:
     def __init__(self, base_url: str, model_name: str):
         self.base_url = base_url
         self.model_name = model_name
+        # Shared aiohttp session, attached by the AgentOrchestrator on first use
+        self.session: Optional[aiohttp.ClientSession] = None
+
+        # Serialized request bodies without the prompt, per (system prompt, stream)
+        self._body_prefixes: Dict[Tuple[Optional[str], bool], bytes] = {}
+
+        # Keep-alive connection pool for the synchronous request path
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64)
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
         logger.info(f"Initialized LLM interface with model: {model_name}")
 
     def generate_response(
-        self, prompt: str, system_prompt: Optional[str] = None
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        cache_query: Optional[str] = None,
+    ) -> str:
+        """Generate a response from the LLM using Ollama API.
+
+        ``cache_query`` is the customer query the prompt answers; pass it only
+        when the prompt holds nothing but that query and static knowledge, so
+        CachedLLMUtils may reuse the answer for similar queries.
+        """
+        try:
+            return self._generate(prompt, system_prompt, cache_query)
+        except Exception as e:
+            return self._error_response(e)
+
+    async def agenerate_response(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        cache_query: Optional[str] = None,
     ) -> str:
-        """Generate a response from the LLM using Ollama API"""
+        """Generate a response from the LLM without blocking the event loop"""
         try:
-            url = f"{self.base_url}/api/generate"
-            payload = {"model": self.model_name, "prompt": prompt, "stream": False}
+            return await self._agenerate(prompt, system_prompt, cache_query)
+        except Exception as e:
+            return self._error_response(e)
 
+    async def agenerate_response_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        cache_query: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Yield the LLM response in chunks as Ollama generates it"""
+        try:
+            async for chunk in self._agenerate_stream(
+                prompt, system_prompt, cache_query
+            ):
+                yield chunk
+        except Exception as e:
+            yield self._error_response(e)
+
+    def _build_body(
+        self, prompt: str, system_prompt: Optional[str], stream: bool = False
+    ) -> bytes:
+        """Serialize the Ollama /api/generate request body.
+
+        Everything but the prompt is fixed per agent, so that part (including
+        the system prompt) is serialized once and only the prompt is encoded
+        on each call.
+        """
+        prefix = self._body_prefixes.get((system_prompt, stream))
+        if prefix is None:
+            fields = {"model": self.model_name, "stream": stream}
             if system_prompt:
-                payload["system"] = system_prompt
+                fields["system"] = system_prompt
+            # Drop the closing brace so the prompt can be appended
+            prefix = orjson.dumps(fields)[:-1]
+            self._body_prefixes[(system_prompt, stream)] = prefix
+
+        return prefix + b',"prompt":' + orjson.dumps(prompt) + b"}"
 
-            response = requests.post(url, json=payload)
-            logger.info(f"LLM response: {response}")
-            print(response.text)
-            logger.info("********************************************")
+    def _generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        cache_query: Optional[str] = None,
+    ) -> str:
+        url = f"{self.base_url}/api/generate"
+        body = self._build_body(prompt, system_prompt)
 
-            # Extract and return the generated text
-            return response.json().get("response", "")
+        response = self._http.post(
+            url, data=body, headers=_JSON_HEADERS, timeout=(3, 120)
+        )
+        logger.debug("LLM response: %s, bytes=%d", response.status_code, len(response.content))
+
+        # Parse the raw body directly, without decoding it to text first
+        return _loads(response.content).get("response", "")
+
+    async def _agenerate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        cache_query: Optional[str] = None,
+    ) -> str:
+        if self.session is None:
+            # No shared session attached yet, keep the event loop free anyway
+            return await asyncio.to_thread(self._generate, prompt, system_prompt)
+
+        url = f"{self.base_url}/api/generate"
+        body = self._build_body(prompt, system_prompt)
+
+        async with self.session.post(
+            url, data=body, headers=_JSON_HEADERS
+        ) as response:
+            logger.debug("LLM response: %s", response.status)
+            result = await response.json(loads=_loads)
+
+        # Extract and return the generated text
+        return result.get("response", "")
+
+    async def _agenerate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        cache_query: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        if self.session is None:
+            # No shared session attached yet, fall back to a single chunk
+            yield await self._agenerate(prompt, system_prompt)
+            return
+
+        url = f"{self.base_url}/api/generate"
+        body = self._build_body(prompt, system_prompt, stream=True)
+
+        async with self.session.post(
+            url, data=body, headers=_JSON_HEADERS
+        ) as response:
+            # Ollama streams one JSON object per line
+            async for line in response.content:
+                if not line.strip():
+                    continue
+                chunk = _loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+
+    def _error_response(self, error: Exception) -> str:
+        logger.error(f"Error generating LLM response: {error}")
+        failures = _llm_failures.get()
+        if failures is not None:
+            failures.append(error)
+        return (
+            f"I encountered an error while processing your request. Error: {str(error)}"
+        )
+
+
+# LLM utilities with response caching
+class CachedLLMUtils(LLMUtils):
+    """LLMUtils with an exact-match tier and a semantic tier in front of Ollama.
+
+    Exact repeats of a (system prompt, prompt) pair are answered from an
+    in-memory LRU keyed by xxhash. Otherwise, when the caller passes the
+    customer query as ``cache_query``, the query (not the templated prompt) is
+    embedded and looked up in a Chroma collection; a hit closer than
+    ``distance_threshold`` (cosine distance) is returned without calling the
+    LLM. Queries containing numbers never use the semantic tier, since
+    "ORD-12345" and "ORD-56789" embed almost identically.
+
+    Pass the knowledge base's ``embedding_function`` to reuse its model
+    instead of loading ``embedding_model`` a second time.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model_name: str,
+        cache_collection: Collection,
+        embedding_model: str = "all-MiniLM-L6-v2",
+        distance_threshold: float = 0.05,
+        exact_cache_size: int = 10_000,
+        embedding_function: Optional[EmbeddingFunction] = None,
+    ):
+        super().__init__(base_url, model_name)
+        self.cache_collection = cache_collection
+        self.distance_threshold = distance_threshold
+        self._embedding_function = embedding_function
+        self._embedder = (
+            SentenceTransformer(embedding_model) if embedding_function is None else None
+        )
+        self._exact_cache = LRUCache(maxsize=exact_cache_size)
+        if embedding_function is None:
+            logger.info(f"Response cache enabled with embedding model: {embedding_model}")
+        else:
+            logger.info("Response cache enabled with the shared embedding function")
+
+    def _generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        cache_query: Optional[str] = None,
+    ) -> str:
+        key = self._exact_key(prompt, system_prompt)
+        cached = self._exact_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if not self._semantic_cacheable(cache_query):
+            cached = super()._generate(prompt, system_prompt)
+        else:
+            embedding = self._embed(cache_query)
+            cached = self._semantic_lookup(embedding, system_prompt)
+            if cached is None:
+                cached = super()._generate(prompt, system_prompt)
+                self._semantic_store(key, embedding, system_prompt, cached)
+
+        if cached:
+            self._exact_cache[key] = cached
+        return cached
+
+    async def _agenerate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        cache_query: Optional[str] = None,
+    ) -> str:
+        key = self._exact_key(prompt, system_prompt)
+        cached = self._exact_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if not self._semantic_cacheable(cache_query):
+            cached = await super()._agenerate(prompt, system_prompt)
+        else:
+            # Embedding and Chroma lookups are blocking, keep them off the loop
+            embedding = await asyncio.to_thread(self._embed, cache_query)
+            cached = await asyncio.to_thread(
+                self._semantic_lookup, embedding, system_prompt
+            )
+            if cached is None:
+                cached = await super()._agenerate(prompt, system_prompt)
+                await asyncio.to_thread(
+                    self._semantic_store, key, embedding, system_prompt, cached
+                )
+
+        if cached:
+            self._exact_cache[key] = cached
+        return cached
+
+    async def _agenerate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        cache_query: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        key = self._exact_key(prompt, system_prompt)
+        cached = self._exact_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        embedding = None
+        if self._semantic_cacheable(cache_query):
+            embedding = await asyncio.to_thread(self._embed, cache_query)
+            cached = await asyncio.to_thread(
+                self._semantic_lookup, embedding, system_prompt
+            )
+            if cached is not None:
+                self._exact_cache[key] = cached
+                yield cached
+                return
+
+        chunks = []
+        async for chunk in super()._agenerate_stream(prompt, system_prompt):
+            chunks.append(chunk)
+            yield chunk
+
+        response = "".join(chunks)
+        if embedding is not None:
+            await asyncio.to_thread(
+                self._semantic_store, key, embedding, system_prompt, response
+            )
+        if response:
+            self._exact_cache[key] = response
+
+    @staticmethod
+    def _semantic_cacheable(cache_query: Optional[str]) -> bool:
+        """Only queries without IDs, error codes or other numbers may reuse the
+        answer to a similar query"""
+        return bool(cache_query) and _DIGIT_RE.search(cache_query) is None
+
+    @staticmethod
+    def _system_prompt_id(system_prompt: Optional[str]) -> str:
+        return xxhash.xxh64((system_prompt or "").encode()).hexdigest()
+
+    def _exact_key(self, prompt: str, system_prompt: Optional[str]) -> str:
+        return xxhash.xxh64(
+            f"{self._system_prompt_id(system_prompt)}:{prompt}".encode()
+        ).hexdigest()
+
+    def _embed(self, text: str) -> List[float]:
+        if self._embedding_function is not None:
+            return list(self._embedding_function([text])[0])
+        return self._embedder.encode(text, normalize_embeddings=True).tolist()
+
+    def _semantic_lookup(
+        self, embedding: List[float], system_prompt: Optional[str]
+    ) -> Optional[str]:
+        """Return a cached response for a semantically similar query, if any"""
+        try:
+            results = self.cache_collection.query(
+                query_embeddings=[embedding],
+                n_results=1,
+                where={"system_prompt_id": self._system_prompt_id(system_prompt)},
+            )
         except Exception as e:
-            logger.error(f"Error generating LLM response: {e}")
-            return (
-                f"I encountered an error while processing your request. Error: {str(e)}"
+            logger.warning(f"Response cache lookup failed: {e}")
+            return None
+
+        distances = results.get("distances", [[]])[0]
+        if distances and distances[0] < self.distance_threshold:
+            logger.debug("Response cache hit (distance %.3f)", distances[0])
+            return results["documents"][0][0]
+        return None
+
+    def _semantic_store(
+        self,
+        key: str,
+        embedding: List[float],
+        system_prompt: Optional[str],
+        response: str,
+    ):
+        """Add a freshly generated response to the semantic cache"""
+        if not response:
+            return
+        try:
+            self.cache_collection.upsert(
+                ids=[key],
+                embeddings=[embedding],
+                documents=[response],
+                metadatas=[{"system_prompt_id": self._system_prompt_id(system_prompt)}],
             )
+        except Exception as e:
+            logger.warning(f"Failed to store response in cache: {e}")
 
 
 # Base Agent class
 class BaseAgent:
+    # Whether prompts hold only the query and static knowledge (no live API
+    # data), so the LLM's semantic cache may answer similar queries
+    semantic_cacheable = False
+
     def __init__(self, llm_utils: LLMUtils):
         self.llm_utils = llm_utils
+        # Shared aiohttp session for tool/API calls, set by the AgentOrchestrator
+        self.session: Optional[aiohttp.ClientSession] = None
 
     def process(
         self, query: str, conversation_history: List[Dict[str, Any]] = None
@@ -57,6 +443,62 @@ class BaseAgent:
         """Process a query and return a response"""
         raise NotImplementedError("Subclasses must implement this method")
 
+    async def _build_prompt(
+        self, query: str, prefetched_context: Optional[List[str]] = None
+    ) -> str:
+        """Build the LLM prompt for a query"""
+        raise NotImplementedError("Subclasses must implement this method")
+
+    async def process_stream(
+        self,
+        query: str,
+        conversation_history: List[Dict[str, Any]] = None,
+        prefetched_context: Optional[List[str]] = None,
+    ) -> AsyncIterator[str]:
+        """Process a query and yield the response as the LLM generates it"""
+        prompt = await self._build_prompt(query, prefetched_context)
+        async for chunk in self.llm_utils.agenerate_response_stream(
+            prompt,
+            self.system_prompt,
+            cache_query=query if self.semantic_cacheable else None,
+        ):
+            yield chunk
+
+
+# Router response formats
+class SingleRouteResponse(BaseModel):
+    classification: str
+    confidence: float
+    requires_clarification: bool
+    clarification_question: Optional[str] = None
+
+
+class RoutePart(BaseModel):
+    query_part: str
+    classification: str
+
+
+class MultiRouteResponse(BaseModel):
+    multi_part: bool
+    parts: List[RoutePart]
+
+
+def _route_format(value: Any) -> str:
+    if isinstance(value, dict):
+        return "multi" if "multi_part" in value else "single"
+    return "multi" if isinstance(value, MultiRouteResponse) else "single"
+
+
+RouteResponse = Annotated[
+    Union[
+        Annotated[MultiRouteResponse, Tag("multi")],
+        Annotated[SingleRouteResponse, Tag("single")],
+    ],
+    Discriminator(_route_format),
+]
+
+_ROUTE_ADAPTER = TypeAdapter(RouteResponse)
+
 
 # Router Agent
 class RouterAgent(BaseAgent):
@@ -143,52 +585,34 @@ class RouterAgent(BaseAgent):
     #             "clarification_question": "Could you please provide more details about your question?",
     #         }
 
-    def process(self, query: str, conversation_history: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def process(
+        self, query: str, conversation_history: List[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         prompt = f"CLASSIFY QUERY: {query}\n\nOUTPUT JSON:"
-        response = self.llm_utils.generate_response(prompt, self.system_prompt)
-        logger.info(f"Router Agent response: {response}")
-        logger.info("********************************************")
-        
-        # Clean the response before parsing
-        cleaned_response = self._clean_json_response(response)
-        logger.info(f"Cleaned response: {cleaned_response}")
-        logger.info("********************************************")
+        response = await self.llm_utils.agenerate_response(prompt, self.system_prompt)
+        logger.debug("Router Agent response: %.200s", response)
         
         try:
-            result = json.loads(cleaned_response)
-            logger.info(f"JSON parsed successfully: {result}")
-            logger.info("********************************************")
-            return self._validate_response_structure(result)
-        except json.JSONDecodeError as e:
+            result = self._parse_json_response(response)
+            logger.debug("Valid response structure: %.200s", result)
+            return result
+        except ValidationError as e:
             logger.error(f"JSON parsing failed. Raw response: {response}")
             return self._safe_fallback_response(query, e)
 
-    def _clean_json_response(self, response: str) -> str:
-        """Remove non-JSON content from the response"""
-        # Remove markdown code blocks
-        response = response.replace('```json', '').replace('```', '')
-        # Extract first JSON object
-        start = response.find('{')
-        end = response.rfind('}') + 1
-        return response[start:end] if start != -1 and end != 0 else response
-
-    def _validate_response_structure(self, result: Dict) -> Dict:
-        """Ensure response has required fields"""
-        required_single = ["classification", "confidence", "requires_clarification"]
-        required_multi = ["multi_part", "parts"]
-        
-        if "multi_part" in result:
-            if not all(k in result for k in required_multi):
-                raise ValueError("Invalid multi-part structure")
-            for part in result.get("parts", []):
-                if "query_part" not in part or "classification" not in part:
-                    raise ValueError("Invalid part structure")
-        else:
-            if not all(k in result for k in required_single):
-                raise ValueError("Missing required fields")
-        logger.info(f"Valid response structure: {result}")
-        logger.info("********************************************")       
-        return result
+    def _parse_json_response(self, response: str) -> Dict[str, Any]:
+        """Parse and validate the first JSON object in the response.
+
+        Raises ValidationError if the object is malformed or doesn't match
+        either routing format.
+        """
+        # Markdown fences and explanatory text around the object are skipped
+        cleaned_response = extract_json_object(response) or response
+        logger.debug("Cleaned response: %.200s", cleaned_response)
+
+        # Parse and validate in one pass over the bytes
+        route = _ROUTE_ADAPTER.validate_json(cleaned_response.encode())
+        return route.model_dump(exclude_none=True)
 
     def _safe_fallback_response(self, query: str, error: Exception) -> Dict:
         """Create a safe fallback response when parsing fails"""
@@ -204,6 +628,9 @@ class RouterAgent(BaseAgent):
 
 # Product Specialist Agent
 class ProductSpecialistAgent(BaseAgent):
+    # Answers come from the catalog, FAQs and product docs only
+    semantic_cacheable = True
+
     def __init__(
         self,
         llm_utils: LLMUtils,
@@ -215,6 +642,21 @@ class ProductSpecialistAgent(BaseAgent):
         self.product_catalog = product_catalog
         self.faqs = faqs
         self.vector_db = vector_db
+
+        # Exact-match FAQ indexes, checked before the vector database: first
+        # on the lowercased question, then on its normalized form
+        self._faq_exact: Dict[str, str] = {}
+        self._faq_normalized: Dict[str, str] = {}
+        for category in faqs.get("categories", []):
+            for question in category.get("questions", []):
+                text = question.get("question", "")
+                entry = (
+                    f"Category: {category.get('name', '')}\n"
+                    f"Question: {text}\n"
+                    f"Answer: {question.get('answer', '')}"
+                )
+                self._faq_exact.setdefault(text.strip().lower(), entry)
+                self._faq_normalized.setdefault(_normalize_question(text), entry)
         self.system_prompt = """
         You are a Product Specialist Agent for TechSolutions customer support.
         You're an expert on TechSolutions products, features, pricing, and plans.
@@ -228,42 +670,63 @@ class ProductSpecialistAgent(BaseAgent):
         Keep your responses friendly, concise, and focused on answering the customer's specific question.
         """
 
-    def _retrieve_relevant_information(self, query: str) -> str:
-        """Retrieve relevant product information from the knowledge base"""
+    def faq_match(self, query: str) -> Optional[str]:
+        """Return the FAQ entry whose question matches the query, if any"""
+        entry = self._faq_exact.get(query.strip().lower())
+        if entry is None:
+            entry = self._faq_normalized.get(_normalize_question(query))
+        return entry
+
+    def _retrieve_relevant_information(self, query: str) -> List[str]:
+        """Retrieve relevant product documents from the knowledge base"""
+        # Queries that are just an FAQ question don't need a vector search
+        entry = self.faq_match(query)
+        if entry is not None:
+            return [entry]
+
         try:
             # Query the vector database for relevant information
             results = self.vector_db.query(query_texts=[query], n_results=3)
 
-            # Extract and return the relevant information
-            relevant_info = "\n\n".join(results.get("documents", [[]])[0])
-            return relevant_info
+            # Extract and return the relevant documents
+            return results.get("documents", [[]])[0]
         except Exception as e:
             logger.error(f"Error retrieving information from vector database: {e}")
-            return ""
+            return []
 
-    def process(
-        self, query: str, conversation_history: List[Dict[str, Any]] = None
+    async def process(
+        self,
+        query: str,
+        conversation_history: List[Dict[str, Any]] = None,
+        prefetched_context: Optional[List[str]] = None,
     ) -> str:
-        # Retrieve relevant information from the knowledge base
-        relevant_info = self._retrieve_relevant_information(query)
-
-        logger.info(f"Relevant information: {relevant_info}")
-        logger.info("********************************************")
-
-        # Construct the prompt
-        prompt = f"""
-        Customer query: {query}
-        
-        Relevant information:
-        {relevant_info}
-        
-        Please provide a helpful response based on this information.
-        """
+        prompt = await self._build_prompt(query, prefetched_context)
 
         # Generate response
-        response = self.llm_utils.generate_response(prompt, self.system_prompt)
+        response = await self.llm_utils.agenerate_response(
+            prompt, self.system_prompt, cache_query=query
+        )
         return response
 
+    async def _build_prompt(
+        self, query: str, prefetched_context: Optional[List[str]] = None
+    ) -> str:
+        # Retrieve relevant information from the knowledge base, unless the
+        # orchestrator already fetched it in a batched query
+        if prefetched_context is not None:
+            relevant_docs = prefetched_context
+        else:
+            relevant_docs = self._retrieve_relevant_information(query)
+
+        logger.debug("Relevant information: %.200s", relevant_docs)
+
+        # Construct the prompt, copying the documents only once
+        parts = ["Customer query: ", query, "\n\nRelevant information:\n"]
+        for doc in relevant_docs:
+            parts += (doc, "\n\n")
+        parts.append("Please provide a helpful response based on this information.")
+        return "".join(parts)
+
 
 # Technical Support Agent
 class TechnicalSupportAgent(BaseAgent):
@@ -284,89 +747,98 @@ class TechnicalSupportAgent(BaseAgent):
         Keep your responses clear, structured, and focused on resolving the customer's technical problem.
         """
 
-    def _retrieve_troubleshooting_info(self, query: str) -> str:
-        """Retrieve relevant troubleshooting information"""
+    def _retrieve_troubleshooting_info(self, query: str) -> List[str]:
+        """Retrieve relevant troubleshooting documents"""
         try:
             # Query the vector database for relevant information
             results = self.vector_db.query(query_texts=[query], n_results=3)
 
-            logger.info(f"Retrieved troubleshooting information: {results}")
-            logger.info("********************************************")
+            logger.debug("Retrieved troubleshooting information: %.200s", results)
 
-            # Extract and return the relevant information
-            relevant_info = "\n\n".join(results.get("documents", [[]])[0])
-            return relevant_info
+            # Extract and return the relevant documents
+            return results.get("documents", [[]])[0]
         except Exception as e:
             logger.error(f"Error retrieving troubleshooting information: {e}")
-            return ""
+            return []
 
 
     async def _call_diagnostic_api(self, issue_description: str) -> Dict[str, Any]:
         """Call the diagnostic API for automated issue identification asynchronously"""
         try:
-            # Run the blocking requests.post in a thread so it doesn't block the event loop
-            response = await asyncio.to_thread(
-                requests.post,
+            async with self.session.post(
                 "http://localhost:8000/api/diagnose",
                 json={"description": issue_description},
-            )
-            response.raise_for_status()
-            logger.info(f"Diagnostic API response: {response}")
-            logger.info("********************************************")
-            result = response.json()
-            logger.info(f"Diagnostic API returned JSON: {result}")
+            ) as response:
+                response.raise_for_status()
+                logger.debug("Diagnostic API response: %s", response.status)
+                result = await response.json(loads=_loads)
+            logger.debug("Diagnostic API returned JSON: %.200s", result)
             return result
         except Exception as e:
             logger.error(f"Error calling diagnostic API: {e}")
             return {}
 
     async def process(
-        self, query: str, conversation_history: List[Dict[str, Any]] = None
+        self,
+        query: str,
+        conversation_history: List[Dict[str, Any]] = None,
+        prefetched_context: Optional[List[str]] = None,
     ) -> str:
-        # Retrieve relevant troubleshooting information (synchronously)
-        relevant_info = self._retrieve_troubleshooting_info(query)
-        logger.info(f"Relevant troubleshooting information: {relevant_info}")
-        logger.info("********************************************")
+        prompt = await self._build_prompt(query, prefetched_context)
+
+        # Generate response using the LLM
+        response = await self.llm_utils.agenerate_response(prompt, self.system_prompt)
+        return response
+
+    async def _build_prompt(
+        self, query: str, prefetched_context: Optional[List[str]] = None
+    ) -> str:
+        # Retrieve relevant troubleshooting information (synchronously), unless
+        # the orchestrator already fetched it in a batched query
+        if prefetched_context is not None:
+            relevant_docs = prefetched_context
+        else:
+            relevant_docs = self._retrieve_troubleshooting_info(query)
+        logger.debug("Relevant troubleshooting information: %.200s", relevant_docs)
 
         # Get diagnostic suggestions asynchronously
         diagnostic_info = await self._call_diagnostic_api(query)
-        logger.info(f"Diagnostic API response from process function: {diagnostic_info}")
-        logger.info("********************************************")
-        diagnostic_text = ""
+        logger.debug("Diagnostic API response from process function: %.200s", diagnostic_info)
+
+        # Construct the prompt for the LLM, copying the documents only once
+        parts = ["Customer query: ", query, "\n\nRelevant troubleshooting information:\n"]
+        for doc in relevant_docs:
+            parts += (doc, "\n\n")
+
         if diagnostic_info:
-            solutions = diagnostic_info.get("solutions", [])
-            solutions_text = "\n".join([f"- {solution}" for solution in solutions])
-            diagnostic_text = f"""
-            Diagnostic results:
-            Issue: {diagnostic_info.get('name', 'Unknown issue')}
-            Suggested solutions:
-            {solutions_text}
-            Documentation: {diagnostic_info.get('documentation_link', '')}
-            """
+            parts += (
+                "Diagnostic results:\nIssue: ",
+                diagnostic_info.get("name", "Unknown issue"),
+                "\nSuggested solutions:\n",
+            )
+            for solution in diagnostic_info.get("solutions", []):
+                parts += ("- ", solution, "\n")
+            parts += (
+                "Documentation: ",
+                diagnostic_info.get("documentation_link", ""),
+                "\n\n",
+            )
+
+        parts.append("Please provide a helpful response to resolve this technical issue.")
+        return "".join(parts)
 
-        # Construct the prompt for the LLM
-        prompt = f"""
-        Customer query: {query}
-        
-        Relevant troubleshooting information:
-        {relevant_info}
-        
-        {diagnostic_text}
-        
-        Please provide a helpful response to resolve this technical issue.
-        """
 
-        # Generate response using the LLM (this call remains synchronous)
-        response = self.llm_utils.generate_response(prompt, self.system_prompt)
-        return response
 
+async def _no_details() -> Dict[str, Any]:
+    """Placeholder lookup for IDs that are absent from the query"""
+    return {}
 
 
 # Order/Billing Agent
 class OrderBillingAgent(BaseAgent):
     def __init__(self, llm_utils: LLMUtils, product_catalog: Dict[str, Any]):
         super().__init__(llm_utils)
-        self.product_catalog = product_catalog
+        self.reload(product_catalog)
         self.system_prompt = """
         You are an Order and Billing Agent for TechSolutions customer support.
         You're an expert in handling inquiries about orders, invoices, payments, and subscriptions.
@@ -380,18 +852,25 @@ class OrderBillingAgent(BaseAgent):
         Keep your responses clear, specific, and focused on addressing the customer's billing-related questions.
         """
 
+    def reload(self, product_catalog: Dict[str, Any]):
+        """Replace the product catalog and refresh its cached pricing text"""
+        self.product_catalog = product_catalog
+        # The catalog doesn't change between queries, so serialize it once
+        self._products_info = orjson.dumps(
+            product_catalog.get("products", []), option=orjson.OPT_INDENT_2
+        ).decode()
+
     async def _get_order_details(self, order_id: str) -> Dict[str, Any]:
         """Retrieve order details from the Order API"""
         try:
-            response = await asyncio.to_thread(
-            requests.get, f"http://localhost:8000/api/orders/{order_id}"
-        )
-            response.raise_for_status()
-            logger.info(f"Order details from the order API: {response}")
-            logger.info("********************************************")
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
+            async with self.session.get(
+                f"http://localhost:8000/api/orders/{order_id}"
+            ) as response:
+                response.raise_for_status()
+                logger.debug("Order details from the order API: %s", response.status)
+                return await response.json(loads=_loads)
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
                 logger.warning(f"Order not found: {order_id}")
                 return {}
             else:
@@ -404,15 +883,14 @@ class OrderBillingAgent(BaseAgent):
     async def _get_account_details(self, account_id: str) -> Dict[str, Any]:
         """Retrieve account details from the Account API"""
         try:
-            response = await asyncio.to_thread(
-            requests.get, f"http://localhost:8000/api/accounts/{account_id}"
-        )
-            logger.info(f"Account details from the account API: {response}")
-            logger.info("********************************************")
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
+            async with self.session.get(
+                f"http://localhost:8000/api/accounts/{account_id}"
+            ) as response:
+                logger.debug("Account details from the account API: %s", response.status)
+                response.raise_for_status()
+                return await response.json(loads=_loads)
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
                 logger.warning(f"Account not found: {account_id}")
                 return {}
             else:
@@ -425,71 +903,69 @@ class OrderBillingAgent(BaseAgent):
     async def process(
         self, query: str, conversation_history: List[Dict[str, Any]] = None
     ) -> str:
-        # Extract order ID if present in the query
-        order_id = None
-        import re
-
-        order_match = re.search(r"ORD-\d+", query)
-        if order_match:
-            order_id = order_match.group(0)
-        
-        logger.info(f"Order ID from the process function: {order_id}")
-        logger.info("********************************************")
-
-        # Extract account ID if present in the query
-        account_id = None
-        account_match = re.search(r"ACC-\d+", query)
-        if account_match:
-            account_id = account_match.group(0)
+        prompt = await self._build_prompt(query)
 
-        logger.info(f"Account ID from the process function: {account_id}")
-        logger.info("********************************************")
+        # Generate response
+        response = await self.llm_utils.agenerate_response(prompt, self.system_prompt)
+        logger.debug("Billing Agent response: %.200s", response)
+        return response
 
-        # Retrieve order details if order ID is available
-        order_details = {}
-        if order_id:
-            order_details = await self._get_order_details(order_id)
+    async def _build_prompt(
+        self, query: str, prefetched_context: Optional[List[str]] = None
+    ) -> str:
+        # Extract order and account IDs if present in the query
+        order_id, account_id = _extract_ids(query)
 
-        logger.info(f"Order details from the process function: {order_details}")
-        logger.info("********************************************")
+        logger.debug("Order ID from the process function: %s", order_id)
+        logger.debug("Account ID from the process function: %s", account_id)
 
-        # Retrieve account details if account ID is available
-        account_details = {}
-        if account_id:
-            account_details = await self._get_account_details(account_id)
+        # Retrieve order and account details concurrently when IDs are available
+        order_details, account_details = await asyncio.gather(
+            self._get_order_details(order_id) if order_id else _no_details(),
+            self._get_account_details(account_id) if account_id else _no_details(),
+        )
 
-        logger.info(f"Account details from the process function: {account_details}")
-        logger.info("********************************************")
+        logger.debug("Order details from the process function: %.200s", order_details)
+        logger.debug("Account details from the process function: %.200s", account_details)
 
         # Construct the prompt with available information
         prompt = f"Customer query: {query}\n\n"
 
         if order_details:
-            prompt += f"Order information:\n{json.dumps(order_details, indent=2)}\n\n"
+            order_json = orjson.dumps(order_details, option=orjson.OPT_INDENT_2)
+            prompt += f"Order information:\n{order_json.decode()}\n\n"
 
         if account_details:
-            prompt += (
-                f"Account information:\n{json.dumps(account_details, indent=2)}\n\n"
-            )
+            account_json = orjson.dumps(account_details, option=orjson.OPT_INDENT_2)
+            prompt += f"Account information:\n{account_json.decode()}\n\n"
 
         # Add product pricing information if relevant
-        if (
-            "pricing" in query.lower()
-            or "cost" in query.lower()
-            or "price" in query.lower()
-        ):
-            products_info = json.dumps(
-                self.product_catalog.get("products", []), indent=2
-            )
-            prompt += f"Product pricing information:\n{products_info}\n\n"
+        if _PRICE_RE.search(query):
+            prompt += f"Product pricing information:\n{self._products_info}\n\n"
 
         prompt += "Please provide a helpful response to this billing or order question."
+        return prompt
+
+
+# User limits per subscription plan; other plans get _DEFAULT_USER_LIMIT
+_PLAN_LIMITS = {"cm-pro": 20, "cm-enterprise": float("inf")}
+_DEFAULT_USER_LIMIT = 5
+
+_ADD_USER_TEMPLATE = (
+    "I'd be happy to help you add users to your account.\n\n"
+    "Your current subscription plan is: %s.\n"
+    "Current number of user accounts: %s.\n"
+    "Available user slots: %s.\n\n"
+    "To add users, please follow these steps:\n"
+    "1. Log in to the customer portal at portal.techsolutions.example.com\n"
+    "2. Navigate to Admin > User Management > Add User\n"
+    "3. Enter the email addresses for the new users\n"
+    "4. Select the appropriate role for each new user (Admin, Operator, Auditor, or Viewer)\n"
+    "5. Customize permissions if needed\n"
+    "6. Click 'Send Invitation'\n\n"
+    "If you need to add users beyond your plan's limit, you may consider purchasing additional licenses."
+)
 
-        # Generate response
-        response = self.llm_utils.generate_response(prompt, self.system_prompt)
-        logger.info(f"Billing Agent response: {response}")
-        logger.info("********************************************")
-        return response
 
 # Account Management Agent
 class AccountManagementAgent(BaseAgent):
@@ -512,15 +988,12 @@ class AccountManagementAgent(BaseAgent):
         """Retrieve account details using the Account API."""
         try:
             url = f"http://localhost:8000/api/accounts/{account_id}"
-            response = await asyncio.to_thread(requests.get, url)
-            response.raise_for_status()
-            logger.info(f"Account API response: {response}")
-            logger.info(f"Account API response status: {response.status_code}")
-            logger.info(f"Raw account API response text: {response.text}")
-            logger.info("********************************************")
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
+            async with self.session.get(url) as response:
+                response.raise_for_status()
+                logger.debug("Account API response status: %s", response.status)
+                return await response.json(loads=_loads)
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
                 logger.warning(f"Account not found: {account_id}")
                 return {}
             else:
@@ -538,60 +1011,76 @@ class AccountManagementAgent(BaseAgent):
         For this scenario, we'll assume that the account id might be extracted from the query.
         If not, you could use a default value or query context.
         """
-        import re
-
         # Extract an account id from the query (e.g., ACC-1111). This is just one approach.
-        account_id = None
-        account_match = re.search(r"ACC-\d+", query)
-        if account_match:
-            account_id = account_match.group(0)
-        
+        _, account_id = _extract_ids(query)
+
         # For testing purposes, if no account id is provided, use a dummy account id.
         if not account_id:
             account_id = "ACC-1111"
         
-        logger.info(f"Account ID extracted: {account_id}")
+        logger.debug("Account ID extracted: %s", account_id)
         
         # Retrieve account details from the account API
         account_info = await self._get_account_info(account_id)
-        logger.info(f"Retrieved account info: {account_info}")
+        logger.debug("Retrieved account info: %.200s", account_info)
         
         # For this scenario we expect account_info to include subscription data.
         # You can then extract the subscription plan and calculate available user slots.
         subscription = account_info.get("subscription", {})
         plan = subscription.get("plan", "unknown")
-        # Here you can define your logic. For example:
-        if plan.lower() == "cm-pro":
-            user_limit = 20
-        elif plan.lower() == "cm-enterprise":
-            user_limit = float("inf")  # unlimited
-        else:
-            user_limit = 5  # default for basic plans
+        user_limit = _PLAN_LIMITS.get(plan.lower(), _DEFAULT_USER_LIMIT)
         
         # You might also keep track of the number of users on the account
         current_user_count = len(account_info.get("users", []))
         available_slots = "unlimited" if user_limit == float("inf") else max(0, user_limit - current_user_count)
         
         # Construct a response message based on this information
-        response_message = (
-            f"I'd be happy to help you add users to your account.\n\n"
-            f"Your current subscription plan is: {plan}.\n"
-            f"Current number of user accounts: {current_user_count}.\n"
-            f"Available user slots: {available_slots}.\n\n"
-            f"To add users, please follow these steps:\n"
-            f"1. Log in to the customer portal at portal.techsolutions.example.com\n"
-            f"2. Navigate to Admin > User Management > Add User\n"
-            f"3. Enter the email addresses for the new users\n"
-            f"4. Select the appropriate role for each new user (Admin, Operator, Auditor, or Viewer)\n"
-            f"5. Customize permissions if needed\n"
-            f"6. Click 'Send Invitation'\n\n"
-            f"If you need to add users beyond your plan's limit, you may consider purchasing additional licenses."
-        )
+        response_message = _ADD_USER_TEMPLATE % (plan, current_user_count, available_slots)
         
         # Optionally, incorporate additional LLM instructions using your llm_utils if desired
         # For simplicity, we return the constructed message here.
         return response_message
 
+    async def process_stream(
+        self,
+        query: str,
+        conversation_history: List[Dict[str, Any]] = None,
+        prefetched_context: Optional[List[str]] = None,
+    ) -> AsyncIterator[str]:
+        # The response is templated rather than generated, so emit it in one go
+        yield await self.process(query, conversation_history)
+
+
+_GENERAL_SYSTEM_PROMPT = """
+            You are a Customer Support Agent for TechSolutions.
+            Provide helpful, friendly, and concise responses to general customer inquiries.
+            If the query should be handled by a specialist agent, indicate which type of specialist would be appropriate.
+            """
+
+_PART_FALLBACK_RESPONSE = (
+    "I'm sorry, I couldn't process this part of your request. "
+    "Please try asking about it separately."
+)
+
+
+def _general_prompt(query: str) -> str:
+    return f"""
+            Customer query: {query}
+            
+            Please provide a helpful and friendly general response to this query.
+            """
+
+
+# Conversation turns kept per conversation
+_HISTORY_LENGTH = 32
+
+# Answer cache: cosine distance for a hit, entry lifetime in seconds, and how
+# many stores between sweeps of expired entries
+_QUERY_CACHE_DISTANCE = 0.05
+_QUERY_CACHE_TTL = 24 * 3600
+_QUERY_CACHE_SWEEP_EVERY = 100
+
+
 # Orchestrator implementation
 class AgentOrchestrator:
     def __init__(
@@ -599,11 +1088,26 @@ class AgentOrchestrator:
         llm_utils: LLMUtils,
         knowledge_base: Dict[str, Any],
         vector_db: Dict[str, Collection],
+        query_cache: Optional[Collection] = None,
     ):
         self.llm_utils = llm_utils
         self.knowledge_base = knowledge_base
         self.vector_db = vector_db
-        self.conversations = {}
+
+        # Final answers to first-turn queries, looked up by query similarity so
+        # repeated questions skip routing, retrieval and generation entirely
+        self.query_cache = query_cache
+        self._query_cache_stores = 0
+
+        # Recent turns per conversation; idle conversations expire after an
+        # hour and only the last _HISTORY_LENGTH turns are kept
+        self.conversations = TTLCache(maxsize=10_000, ttl=3600)
+
+        # Router classifications keyed by the normalized query hash
+        self._route_cache = LRUCache(maxsize=10_000)
+
+        # Shared HTTP session, created lazily inside the running event loop
+        self._session: Optional[aiohttp.ClientSession] = None
 
         # Initialize agents
         self.router_agent = RouterAgent(llm_utils)
@@ -625,29 +1129,230 @@ class AgentOrchestrator:
 
         logger.info("Agent Orchestrator initialized with all agents")
 
+        # Load the embedding model and indexes in the background so the first
+        # real query doesn't pay for it
+        threading.Thread(target=self._warm_up, daemon=True).start()
+
+    def _warm_up(self):
+        """Run a throwaway query against each retrieval collection"""
+        for collection_name in ("products", "technical"):
+            try:
+                self.vector_db[collection_name].query(
+                    query_texts=["warmup"], n_results=1
+                )
+            except Exception as e:
+                logger.warning(f"Failed to warm up {collection_name} collection: {e}")
+        logger.info("Vector database warm-up complete")
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        """Create the shared keep-alive HTTP session and hand it to every agent"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=64, keepalive_timeout=30),
+                json_serialize=_dumps,
+            )
+            self.llm_utils.session = self._session
+            for agent in (
+                self.router_agent,
+                self.product_agent,
+                self.technical_agent,
+                self.billing_agent,
+                self.account_agent,
+            ):
+                agent.session = self._session
+        return self._session
+
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
     async def process_query(
         self, query: str, conversation_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """Process a customer query through the appropriate agent"""
-        # Initialize conversation if new
-        if conversation_id not in self.conversations:
-            self.conversations[conversation_id] = []
+        self._ensure_session()
+
+        # Get conversation history, starting a new conversation if needed
+        history = self._get_history(conversation_id)
+        conversation_history = list(history)
+
+        cached = await self._lookup_answer(query, conversation_history)
+        if cached is not None:
+            final_response, agent_type = cached
+        else:
+            final_response, agent_type = await self._answer(
+                query, conversation_history
+            )
 
-        # Get conversation history
-        conversation_history = self.conversations.get(conversation_id, [])
+        # Update conversation history
+        history.append(
+            {"query": query, "response": final_response, "agent": agent_type}
+        )
+        # Re-insert so the conversation's expiry restarts from this turn
+        self.conversations[conversation_id] = history
 
-        # Route the query using the router agent
-        routing_result = self.router_agent.process(query, conversation_history)
+        return {
+            "response": final_response,
+            "agent": agent_type,
+            "conversation_id": conversation_id or "new_conversation",
+        }
+
+    async def process_query_stream(
+        self, query: str, conversation_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Process a customer query, yielding the response as it is generated.
+
+        Single-part queries stream the agent's LLM output token by token. For
+        multi-part queries the parts run concurrently and each is emitted as
+        soon as it finishes, so the fastest part reaches the client first.
+        """
+        self._ensure_session()
+
+        # Get conversation history, starting a new conversation if needed
+        history = self._get_history(conversation_id)
+        conversation_history = list(history)
+
+        cached = await self._lookup_answer(query, conversation_history)
+        if cached is not None:
+            final_response, agent_type = cached
+            yield final_response
+            history.append(
+                {"query": query, "response": final_response, "agent": agent_type}
+            )
+            self.conversations[conversation_id] = history
+            return
+
+        # Left bound on purpose: resetting could run in another context if the
+        # client disconnects, and every query binds a fresh list anyway
+        failures: List[Exception] = []
+        _llm_failures.set(failures)
+
+        routing_result = await self._route(query, conversation_history)
+        cacheable = "parse_error" not in routing_result
+
+        responses = []
+        if routing_result.get("multi_part", False):
+            parts = routing_result.get("parts", [])
+            # Embedding and the Chroma lookups are blocking
+            contexts = await asyncio.to_thread(self._prefetch_context, parts)
+            tasks = [
+                asyncio.create_task(
+                    self._process_single_query(
+                        part.get("query_part"),
+                        part.get("classification"),
+                        conversation_history,
+                        prefetched_context=context,
+                    )
+                )
+                for part, context in zip(parts, contexts)
+            ]
+
+            try:
+                for next_part in asyncio.as_completed(tasks):
+                    try:
+                        part_response = await next_part
+                    except Exception as e:
+                        logger.error(f"Error processing query part: {e}")
+                        part_response = _PART_FALLBACK_RESPONSE
+                        cacheable = False
+                    if responses:
+                        yield "\n\n"
+                    responses.append(f"{part_response}")
+                    yield f"{part_response}"
+            finally:
+                # Client disconnected mid-stream, don't leave parts running
+                for task in tasks:
+                    task.cancel()
+
+            agent_type = "multiple"
+        elif routing_result.get("requires_clarification", False):
+            clarification = routing_result.get(
+                "clarification_question",
+                "Could you please provide more details about your question?",
+            )
+            responses.append(clarification)
+            yield clarification
+            agent_type = "router"
+        else:
+            classification = routing_result.get("classification", "General")
+            async for chunk in self._stream_single_query(
+                query, classification, conversation_history
+            ):
+                responses.append(chunk)
+                yield chunk
+            agent_type = classification.lower()
+
+        # Update conversation history
+        final_response = ("\n\n" if agent_type == "multiple" else "").join(responses)
+        history.append(
+            {"query": query, "response": final_response, "agent": agent_type}
+        )
+        # Re-insert so the conversation's expiry restarts from this turn
+        self.conversations[conversation_id] = history
+
+        # An LLM error reply would otherwise be served from the cache for a day
+        if cacheable and not failures:
+            await self._store_answer(
+                query, conversation_history, final_response, agent_type
+            )
+
+    async def _answer(
+        self, query: str, conversation_history: List[Dict[str, Any]]
+    ) -> Tuple[str, str]:
+        """Route a query and answer it, returning (response, agent type)"""
+        failures: List[Exception] = []
+        token = _llm_failures.set(failures)
+        try:
+            final_response, agent_type, cacheable = await self._generate_answer(
+                query, conversation_history
+            )
+        finally:
+            _llm_failures.reset(token)
+
+        # An LLM error reply would otherwise be served from the cache for a day
+        if cacheable and not failures:
+            await self._store_answer(
+                query, conversation_history, final_response, agent_type
+            )
+        return final_response, agent_type
+
+    async def _generate_answer(
+        self, query: str, conversation_history: List[Dict[str, Any]]
+    ) -> Tuple[str, str, bool]:
+        """Route and answer a query, returning (response, agent type, whether
+        the answer may be cached)"""
+        routing_result = await self._route(query, conversation_history)
+        cacheable = "parse_error" not in routing_result
 
         # Handle multi-part queries
         if routing_result.get("multi_part", False):
+            # Parts are independent, so run them concurrently
+            parts = routing_result.get("parts", [])
+            # Embedding and the Chroma lookups are blocking
+            contexts = await asyncio.to_thread(self._prefetch_context, parts)
+            results = await asyncio.gather(
+                *(
+                    self._process_single_query(
+                        part.get("query_part"),
+                        part.get("classification"),
+                        conversation_history,
+                        prefetched_context=context,
+                    )
+                    for part, context in zip(parts, contexts)
+                ),
+                return_exceptions=True,
+            )
+
             responses = []
-            for part in routing_result.get("parts", []):
-                part_query = part.get("query_part")
-                part_classification = part.get("classification")
-                part_response = await self._process_single_query(
-                    part_query, part_classification, conversation_history
-                )
+            for part, part_response in zip(parts, results):
+                if isinstance(part_response, Exception):
+                    logger.error(
+                        f"Error processing query part {part.get('query_part')!r}: "
+                        f"{part_response}"
+                    )
+                    part_response = _PART_FALLBACK_RESPONSE
+                    cacheable = False
                 responses.append(f"{part_response}")
 
             final_response = "\n\n".join(responses)
@@ -669,41 +1374,175 @@ class AgentOrchestrator:
                 )
                 agent_type = classification.lower()
 
-        # Update conversation history
-        self.conversations[conversation_id].append(
-            {"query": query, "response": final_response, "agent": agent_type}
-        )
+        return final_response, agent_type, cacheable
+
+    @staticmethod
+    def _is_cacheable_query(
+        query: str, conversation_history: List[Dict[str, Any]]
+    ) -> bool:
+        """Only standalone queries without IDs, error codes or other numbers
+        are cached; follow-ups depend on the conversation, and numbers on live
+        data while barely changing the query's embedding."""
+        return not conversation_history and _DIGIT_RE.search(query) is None
+
+    async def _lookup_answer(
+        self, query: str, conversation_history: List[Dict[str, Any]]
+    ) -> Optional[Tuple[str, str]]:
+        """Return (response, agent type) cached for a near-identical query"""
+        if self.query_cache is None or not self._is_cacheable_query(
+            query, conversation_history
+        ):
+            return None
 
-        return {
-            "response": final_response,
-            "agent": agent_type,
-            "conversation_id": conversation_id or "new_conversation",
-        }
+        try:
+            # Embedding and the Chroma lookup are blocking
+            results = await asyncio.to_thread(
+                self.query_cache.query,
+                query_texts=[query],
+                n_results=1,
+                where={"created_at": {"$gte": time.time() - _QUERY_CACHE_TTL}},
+            )
+        except Exception as e:
+            logger.warning(f"Query cache lookup failed: {e}")
+            return None
+
+        distances = results.get("distances", [[]])[0]
+        if distances and distances[0] < _QUERY_CACHE_DISTANCE:
+            logger.debug("Query cache hit (distance %.3f)", distances[0])
+            metadata = results["metadatas"][0][0]
+            return metadata["response"], metadata["agent"]
+        return None
+
+    async def _store_answer(
+        self,
+        query: str,
+        conversation_history: List[Dict[str, Any]],
+        response: str,
+        agent_type: str,
+    ):
+        """Cache the answer to a standalone query, sweeping out expired entries
+        every _QUERY_CACHE_SWEEP_EVERY stores to keep the collection small"""
+        if (
+            self.query_cache is None
+            or not response
+            or not self._is_cacheable_query(query, conversation_history)
+        ):
+            return
+
+        now = time.time()
+        try:
+            await asyncio.to_thread(
+                self.query_cache.upsert,
+                ids=[xxhash.xxh64_hexdigest(query.strip().lower().encode())],
+                # The query is the document so it is what gets embedded
+                documents=[query],
+                metadatas=[
+                    {"response": response, "agent": agent_type, "created_at": now}
+                ],
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store answer in query cache: {e}")
+            return
+
+        self._query_cache_stores += 1
+        if self._query_cache_stores % _QUERY_CACHE_SWEEP_EVERY == 0:
+            try:
+                await asyncio.to_thread(
+                    self.query_cache.delete,
+                    where={"created_at": {"$lt": now - _QUERY_CACHE_TTL}},
+                )
+            except Exception as e:
+                logger.warning(f"Failed to sweep expired query cache entries: {e}")
+
+    def _get_history(self, conversation_id: Optional[str]) -> deque:
+        """Return the turn buffer for a conversation, creating it if new"""
+        history = self.conversations.get(conversation_id)
+        if history is None:
+            history = deque(maxlen=_HISTORY_LENGTH)
+            self.conversations[conversation_id] = history
+        return history
+
+    async def _route(
+        self, query: str, conversation_history: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Route the query, reusing the classification of an identical query"""
+        route_key = xxhash.xxh64_intdigest(query.strip().lower().encode())
+        routing_result = self._route_cache.get(route_key)
+        if routing_result is None:
+            routing_result = await self.router_agent.process(query, conversation_history)
+            # Fallback classifications come from unparseable replies, retry those
+            if "parse_error" not in routing_result:
+                self._route_cache[route_key] = routing_result
+        return routing_result
+
+    def _prefetch_context(
+        self, parts: List[Dict[str, Any]]
+    ) -> List[Optional[List[str]]]:
+        """Retrieve knowledge base context for all query parts at once.
+
+        Parts are grouped by the collection their agent searches, and each
+        collection is queried once with all of its parts so the embedding model
+        runs a single batch instead of one pass per part. Parts whose agent does
+        no retrieval (or whose lookup failed) get None, as do product parts that
+        match an FAQ question, which the agent answers without a vector search.
+        """
+        contexts: List[Optional[List[str]]] = [None] * len(parts)
+
+        for classification, collection_name in (
+            ("Product", "products"),
+            ("Technical", "technical"),
+        ):
+            indices = [
+                i
+                for i, part in enumerate(parts)
+                if part.get("classification") == classification
+                and not (
+                    classification == "Product"
+                    and self.product_agent.faq_match(part.get("query_part", ""))
+                )
+            ]
+            if not indices:
+                continue
+
+            try:
+                results = self.vector_db[collection_name].query(
+                    query_texts=[parts[i].get("query_part") for i in indices],
+                    n_results=3,
+                )
+            except Exception as e:
+                logger.error(f"Error prefetching {collection_name} context: {e}")
+                continue
+
+            for i, documents in zip(indices, results.get("documents", [])):
+                contexts[i] = documents
+
+        return contexts
 
     async def _process_single_query(
         self,
         query: str,
         classification: str,
         conversation_history: List[Dict[str, Any]],
+        prefetched_context: Optional[List[str]] = None,
     ) -> str:
         """Process a single-part query based on its classification"""
         if classification == "Product":
-            logger.info(f"Processing product query, query: {query}")
-            logger.info("********************************************")
-            return await self.product_agent.process(query, conversation_history)
+            logger.debug("Processing product query, query: %s", query)
+            return await self.product_agent.process(
+                query, conversation_history, prefetched_context
+            )
         elif classification == "Technical":
-            logger.info(f"Processing technical query, query: {query}")
-            logger.info("********************************************")
-            return await self.technical_agent.process(query, conversation_history)
+            logger.debug("Processing technical query, query: %s", query)
+            return await self.technical_agent.process(
+                query, conversation_history, prefetched_context
+            )
         elif classification == "Billing":
-            logger.info(f"Processing billing query, query: {query}")
-            logger.info("********************************************")
+            logger.debug("Processing billing query, query: %s", query)
             return await self.billing_agent.process(query, conversation_history)
         elif classification == "Account":
             # Check if Account Management Agent is available (for mid-session challenge)
             if self.account_agent:
-                logger.info(f"Processing account query, query: {query}")
-                logger.info("********************************************")
+                logger.debug("Processing account query, query: %s", query)
                 return await self.account_agent.process(query, conversation_history)
             else:
                 # Fallback to billing agent if account agent not yet implemented
@@ -713,20 +1552,36 @@ class AgentOrchestrator:
                 return fallback_response
         else:
             # Default to a general response
-            general_prompt = f"""
-            Customer query: {query}
-            
-            Please provide a helpful and friendly general response to this query.
-            """
-            general_system_prompt = """
-            You are a Customer Support Agent for TechSolutions.
-            Provide helpful, friendly, and concise responses to general customer inquiries.
-            If the query should be handled by a specialist agent, indicate which type of specialist would be appropriate.
-            """
-            return self.llm_utils.generate_response(
-                general_prompt, general_system_prompt
+            return await self.llm_utils.agenerate_response(
+                _general_prompt(query), _GENERAL_SYSTEM_PROMPT, cache_query=query
             )
 
+    async def _stream_single_query(
+        self,
+        query: str,
+        classification: str,
+        conversation_history: List[Dict[str, Any]],
+    ) -> AsyncIterator[str]:
+        """Stream a single-part query's response based on its classification"""
+        agent = {
+            "Product": self.product_agent,
+            "Technical": self.technical_agent,
+            "Billing": self.billing_agent,
+            "Account": self.account_agent,
+        }.get(classification)
+
+        if agent is not None:
+            logger.debug("Streaming %s query, query: %s", classification.lower(), query)
+            stream = agent.process_stream(query, conversation_history)
+        else:
+            # Default to a general response
+            stream = self.llm_utils.agenerate_response_stream(
+                _general_prompt(query), _GENERAL_SYSTEM_PROMPT, cache_query=query
+            )
+
+        async for chunk in stream:
+            yield chunk
+
     # This method will be implemented during the mid-session challenge
     def add_account_management_agent(self):
         """Add the Account Management Agent (for mid-session challenge)"""
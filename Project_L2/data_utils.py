@@ -1,12 +1,23 @@
+import hashlib
 import json
 import logging
 import os
-from typing import Any, Dict, List, Tuple
-
-import markdown
+import pickle
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
 from chromadb import Collection, PersistentClient
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
 from chromadb.config import Settings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from semantic_text_splitter import TextSplitter
+from sentence_transformers import SentenceTransformer
 
 # Configure logging
 logging.basicConfig(
@@ -14,11 +25,294 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Documents per collection.add call; large enough to amortize per-call
+# overhead, small enough to stay under Chroma's batch size limit
+_ADD_BATCH_SIZE = 200
+
+# Documents per forward pass when embedding a batch
+_ENCODE_BATCH_SIZE = 64
+
+# Source files of the knowledge base, relative to data_dir
+_KNOWLEDGE_BASE_FILES = (
+    "product_catalog.json",
+    "faq.json",
+    "tech_documentation.md",
+    "customer_conversations.jsonl",
+)
+
+# Characters the text splitters repeat between neighbouring chunks
+_CHUNK_OVERLAP = 200
+
+# Markdown heading lines; group 1 is the run of leading hashes
+_HEADING_RE = re.compile(r"^(#+)(.*)$", re.MULTILINE)
+
+# SQLite settings for bulk loading, and the defaults restored afterwards
+_BULK_PRAGMAS = ("journal_mode = OFF", "synchronous = OFF", "temp_store = MEMORY")
+_DEFAULT_PRAGMAS = ("journal_mode = DELETE", "synchronous = FULL", "temp_store = DEFAULT")
+
+
+class SharedModelEmbeddingFunction(EmbeddingFunction):
+    """Chroma embedding function backed by an already loaded SentenceTransformer"""
+
+    def __init__(self, model: SentenceTransformer):
+        self.model = model
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.model.encode(
+            list(input),
+            batch_size=_ENCODE_BATCH_SIZE,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        ).tolist()
+
+
+class LangChainTextSplitter(RecursiveCharacterTextSplitter):
+    """Pure-Python fallback splitter exposing the same chunks() method"""
+
+    def chunks(self, text: str) -> List[str]:
+        return self.split_text(text)
+
+
+def _overlap_length(previous: str, chunk: str, max_overlap: int) -> int:
+    """Length of the longest prefix of chunk that ends previous, or 0.
+
+    Splitter overlaps start on a word boundary, so only matches preceded by
+    whitespace count; a chunk that happens to begin with the previous one's
+    last few letters isn't overlap.
+    """
+    longest = min(max_overlap, len(previous), len(chunk))
+    for length in range(longest, 0, -1):
+        if previous.endswith(chunk[:length]) and (
+            length == len(previous) or previous[-length - 1].isspace()
+        ):
+            return length
+    return 0
+
+
+def merge_small_chunks(
+    chunks: List[str],
+    max_size: int = 1100,
+    min_size: int = 100,
+    overlap: int = _CHUNK_OVERLAP,
+) -> List[str]:
+    """Greedily merge adjacent chunks so fewer, fuller chunks get embedded.
+
+    Neighbours are joined while the result stays within max_size. A final
+    chunk shorter than min_size is folded into the previous one even if that
+    overshoots max_size, so no context-poor fragment is left on its own.
+    The splitters repeat up to ``overlap`` characters of each chunk at the
+    start of the next; that repeated prefix is dropped when two are joined.
+    """
+    merged: List[str] = []
+    # Each chunk is measured once; the buffer keeps its parts and a running
+    # length instead of being re-joined and re-measured on every step
+    buffer: List[str] = []
+    buffer_len = 0
+    previous = ""
+    for chunk in chunks:
+        rest = chunk[_overlap_length(previous, chunk, overlap) :].lstrip()
+        previous = chunk
+        if not buffer:
+            buffer = [chunk]
+            buffer_len = len(chunk)
+        elif not rest:
+            # Entirely repeated from the previous chunk
+            continue
+        elif buffer_len + 1 + len(rest) <= max_size:
+            buffer.append(rest)
+            buffer_len += 1 + len(rest)
+        else:
+            merged.append("\n".join(buffer))
+            buffer = [chunk]
+            buffer_len = len(chunk)
+
+    if buffer:
+        if merged and buffer_len < min_size:
+            # The tail starts a new buffer, so it still carries its overlap
+            head = buffer[0]
+            buffer[0] = head[_overlap_length(merged[-1], head, overlap) :].lstrip()
+            merged[-1] = "\n".join([merged[-1], *filter(None, buffer)])
+        else:
+            merged.append("\n".join(buffer))
+    return merged
+
+
+class Indexer:
+    """Vector store for one document collection.
+
+    The query() and count() signatures follow Chroma's Collection, so agents
+    can search either backend without knowing which one is in use.
+    """
+
+    name: str
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def add(
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        embeddings: np.ndarray,
+    ):
+        raise NotImplementedError
+
+    def persist(self):
+        """Flush added documents to disk"""
+
+    def query(self, query_texts: List[str], n_results: int = 10) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class ChromaIndexer(Indexer):
+    """Indexer backed by a persistent Chroma collection"""
+
+    # Newer Chroma releases take numpy embeddings directly, older ones reject
+    # anything but lists; cleared the first time an array is rejected
+    accepts_ndarray = True
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+        self.name = collection.name
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def add(self, documents, metadatas, ids, embeddings):
+        if ChromaIndexer.accepts_ndarray:
+            try:
+                self.collection.add(
+                    documents=documents,
+                    metadatas=metadatas,
+                    ids=ids,
+                    embeddings=embeddings,
+                )
+                return
+            except ValueError:
+                # Embeddings are validated before anything is written
+                logger.info("Chroma requires list embeddings, converting arrays")
+                ChromaIndexer.accepts_ndarray = False
+
+        self.collection.add(
+            documents=documents,
+            metadatas=metadatas,
+            ids=ids,
+            embeddings=embeddings.tolist(),
+        )
+
+    def query(self, query_texts: List[str], n_results: int = 10) -> Dict[str, Any]:
+        return self.collection.query(query_texts=query_texts, n_results=n_results)
+
+
+class FAISSIndexer(Indexer):
+    """Indexer backed by a FAISS HNSW index with a SQLite metadata sidecar.
+
+    Bulk-building an HNSW graph in FAISS is much faster than Chroma's
+    per-insert index updates. Documents and metadata are stored in SQLite
+    keyed by their position in the FAISS index.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        directory: str,
+        embedding_function: EmbeddingFunction,
+        dimension: int,
+    ):
+        # Optional dependency, only needed when VECTOR_BACKEND=faiss
+        import faiss
+
+        self._faiss = faiss
+        self.name = name
+        self.embedding_function = embedding_function
+        self.index_path = os.path.join(directory, f"{name}.faiss")
+        os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(self.index_path):
+            self.index = faiss.read_index(self.index_path)
+        else:
+            self.index = faiss.IndexHNSWFlat(dimension, 32)
+
+        # Populated from a worker thread, queried from the API thread
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(directory, f"{name}.sqlite"), check_same_thread=False
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "row INTEGER PRIMARY KEY, id TEXT, document TEXT, metadata BLOB)"
+        )
+
+    def count(self) -> int:
+        return self.index.ntotal
+
+    def add(self, documents, metadatas, ids, embeddings):
+        with self._lock:
+            start = self.index.ntotal
+            self.index.add(embeddings)
+            self._db.executemany(
+                "INSERT INTO documents VALUES (?, ?, ?, ?)",
+                (
+                    (start + offset, doc_id, document, orjson.dumps(metadata))
+                    for offset, (doc_id, document, metadata) in enumerate(
+                        zip(ids, documents, metadatas)
+                    )
+                ),
+            )
+
+    def persist(self):
+        with self._lock:
+            self._faiss.write_index(self.index, self.index_path)
+            self._db.commit()
+
+    def query(self, query_texts: List[str], n_results: int = 10) -> Dict[str, Any]:
+        query_embeddings = np.asarray(
+            self.embedding_function(query_texts), dtype=np.float32
+        )
+        with self._lock:
+            distances, rows = self.index.search(query_embeddings, n_results)
+
+            results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            for row_ids, row_distances in zip(rows.tolist(), distances.tolist()):
+                # FAISS pads with -1 when fewer than n_results documents exist
+                hits = [(r, d) for r, d in zip(row_ids, row_distances) if r >= 0]
+                stored = {
+                    row: (doc_id, document, metadata)
+                    for row, doc_id, document, metadata in self._db.execute(
+                        "SELECT row, id, document, metadata FROM documents "
+                        f"WHERE row IN ({','.join('?' * len(hits))})",
+                        [r for r, _ in hits],
+                    )
+                }
+                hits = [(r, d) for r, d in hits if r in stored]
+                results["ids"].append([stored[r][0] for r, _ in hits])
+                results["documents"].append([stored[r][1] for r, _ in hits])
+                results["metadatas"].append([orjson.loads(stored[r][2]) for r, _ in hits])
+                results["distances"].append([d for _, d in hits])
+
+        return results
+
 
 class DataManager:
-    def __init__(self, data_dir: str = "data", db_dir: str = "chroma_db"):
+    def __init__(
+        self,
+        data_dir: str = "data",
+        db_dir: str = "chroma_db",
+        embedding_model: str = "all-MiniLM-L6-v2",
+        text_splitter_backend: str = "semantic",
+        cache_dir: str = "chunk_cache",
+        bulk_mode: bool = True,
+        vector_backend: str = "chroma",
+    ):
         self.data_dir = data_dir
         self.db_dir = db_dir
+        self.text_splitter_backend = text_splitter_backend
+        # Kept outside db_dir so resetting the database keeps the cached chunks
+        self.cache_dir = cache_dir
+        self.embedding_model_name = embedding_model
+        self.bulk_mode = bulk_mode
+        self.vector_backend = vector_backend
 
         # Initialize ChromaDB
         try:
@@ -30,105 +324,290 @@ class DataManager:
             logger.error(f"Failed to initialize ChromaDB: {e}")
             raise
 
+        # One embedding model for every collection, so it is loaded into memory
+        # only once. Documents are embedded with it in batches before being
+        # added; the embedding function embeds queries with the same model.
+        self.embedding_model = SentenceTransformer(embedding_model)
+        self.embedding_function = SharedModelEmbeddingFunction(self.embedding_model)
+
     def load_knowledge_base(self) -> Dict[str, Any]:
-        """Load and prepare knowledge base for agents"""
+        """Load and prepare knowledge base for agents.
+
+        The parsed knowledge base is pickled and reused until one of the source
+        files changes size or modification time.
+        """
         try:
+            cache_path = os.path.join(self.cache_dir, "kb_cache.pkl")
+            cache_key = self._knowledge_base_key()
+            cached = self._read_pickle(cache_path)
+            if cached is not None and cached[0] == cache_key:
+                logger.info("Knowledge base loaded from cache")
+                return cached[1]
+
             # Load product catalog
-            with open(os.path.join(self.data_dir, "product_catalog.json"), "r") as f:
-                product_catalog = json.load(f)
+            with open(os.path.join(self.data_dir, "product_catalog.json"), "rb") as f:
+                product_catalog = orjson.loads(f.read())
 
             # Load FAQs
-            with open(os.path.join(self.data_dir, "faq.json"), "r") as f:
-                faqs = json.load(f)
+            with open(os.path.join(self.data_dir, "faq.json"), "rb") as f:
+                faqs = orjson.loads(f.read())
 
             # Load tech documentation
             with open(os.path.join(self.data_dir, "tech_documentation.md"), "r") as f:
                 tech_docs = f.read()
 
             # Load customer conversations
-            customer_conversations = []
             with open(
-                os.path.join(self.data_dir, "customer_conversations.jsonl"), "r"
+                os.path.join(self.data_dir, "customer_conversations.jsonl"), "rb"
             ) as f:
-                for line in f:
-                    if line.strip():  # Skip empty lines
-                        customer_conversations.append(json.loads(line))
+                customer_conversations = [
+                    orjson.loads(line)
+                    for line in f.read().splitlines()
+                    if line.strip()  # Skip empty lines
+                ]
 
-            logger.info("Knowledge base loaded successfully")
-            return {
+            knowledge_base = {
                 "product_catalog": product_catalog,
                 "faqs": faqs,
                 "tech_docs": tech_docs,
                 "customer_conversations": customer_conversations,
             }
+            self._write_pickle(cache_path, (cache_key, knowledge_base))
+
+            logger.info("Knowledge base loaded successfully")
+            return knowledge_base
         except Exception as e:
             logger.error(f"Failed to load knowledge base: {e}")
             raise
 
+    def _knowledge_base_key(self) -> Tuple:
+        """Identify the current version of each knowledge base source file"""
+        key = []
+        for name in _KNOWLEDGE_BASE_FILES:
+            path = os.path.join(self.data_dir, name)
+            stat = os.stat(path)
+            key.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(key)
+
     def prepare_vector_db(
         self, knowledge_base: Dict[str, Any]
-    ) -> Dict[str, Collection]:
-        """Prepare vector database collections for each type of data"""
-        collections = {}
+    ) -> Dict[str, Indexer]:
+        """Prepare vector database collections for each type of data.
 
+        The collections are independent, so they are prepared concurrently;
+        chunking and embedding release the GIL in their native code.
+        """
         # Create text splitter for chunking documents
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            separators=[
-                "\n## ",
-                "\n### ",
-                "\n#### ",
-                "\n",
-                ". ",
-                "! ",
-                "? ",
-                ";",
-                ":",
-                " ",
-                "",
-            ],
-        )
+        text_splitter = self._create_text_splitter()
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                # Prepare product information collection
+                "products": executor.submit(
+                    self._prepare_product_collection,
+                    knowledge_base["product_catalog"],
+                    knowledge_base["faqs"],
+                    text_splitter,
+                ),
+                # Prepare technical documentation collection
+                "technical": executor.submit(
+                    self._prepare_technical_collection,
+                    knowledge_base["tech_docs"],
+                    text_splitter,
+                ),
+                # Prepare customer conversations collection
+                "conversations": executor.submit(
+                    self._prepare_conversations_collection,
+                    knowledge_base["customer_conversations"],
+                    text_splitter,
+                ),
+            }
 
-        # Prepare product information collection
-        collections["products"] = self._prepare_product_collection(
-            knowledge_base["product_catalog"], knowledge_base["faqs"], text_splitter
+            return {name: future.result() for name, future in futures.items()}
+
+    def _create_text_splitter(self):
+        """Create the text splitter selected by text_splitter_backend.
+
+        "semantic" uses the Rust-backed semantic-text-splitter; "langchain"
+        keeps the original RecursiveCharacterTextSplitter as a fallback.
+        """
+        if self.text_splitter_backend == "langchain":
+            return LangChainTextSplitter(
+                chunk_size=1000,
+                chunk_overlap=_CHUNK_OVERLAP,
+                separators=[
+                    "\n## ",
+                    "\n### ",
+                    "\n#### ",
+                    "\n",
+                    ". ",
+                    "! ",
+                    "? ",
+                    ";",
+                    ":",
+                    " ",
+                    "",
+                ],
+            )
+        return TextSplitter(1000, overlap=_CHUNK_OVERLAP)
+
+    def _get_indexer(self, name: str) -> Indexer:
+        """Create or open the named collection in the configured vector backend"""
+        if self.vector_backend == "faiss":
+            return FAISSIndexer(
+                name,
+                os.path.join(self.db_dir, "faiss"),
+                self.embedding_function,
+                self.embedding_model.get_sentence_embedding_dimension(),
+            )
+        return ChromaIndexer(
+            self.chroma_client.get_or_create_collection(
+                name, embedding_function=self.embedding_function
+            )
         )
 
-        # Prepare technical documentation collection
-        collections["technical"] = self._prepare_technical_collection(
-            knowledge_base["tech_docs"], text_splitter
+    def _split_if_needed(self, text: str, text_splitter, size: int = 1000) -> List[str]:
+        """Split text into chunks, skipping the splitter for short texts.
+
+        A text within the chunk size comes back from either splitter as the
+        single trimmed chunk, so that result is built directly.
+        """
+        stripped = text.strip()
+        if len(stripped) <= size:
+            return [stripped] if stripped else []
+        return text_splitter.chunks(text)
+
+    def get_response_cache_collection(self) -> Collection:
+        """Get the collection backing the semantic LLM response cache"""
+        return self.chroma_client.get_or_create_collection(
+            "responses_cache",
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=self.embedding_function,
         )
 
-        # Prepare customer conversations collection
-        collections["conversations"] = self._prepare_conversations_collection(
-            knowledge_base["customer_conversations"], text_splitter
+    def get_query_cache_collection(self) -> Collection:
+        """Get the collection backing the orchestrator's answer cache"""
+        return self.chroma_client.get_or_create_collection(
+            "query_cache",
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=self.embedding_function,
         )
 
-        return collections
-
     def _prepare_product_collection(
         self, product_catalog: Dict[str, Any], faqs: Dict[str, Any], text_splitter
-    ) -> Collection:
+    ) -> Indexer:
         """Prepare vector collection for product information"""
         try:
             # Create or get the collection
-            collection = self.chroma_client.get_or_create_collection("products")
+            collection = self._get_indexer("products")
 
             # Check if collection already has documents
             if collection.count() > 0:
                 logger.info("Products collection already populated, skipping")
                 return collection
 
-            # Process product catalog
-            product_docs = []
-            product_metadatas = []
-            product_ids = []
+            added = self._populate_collection(
+                collection,
+                [product_catalog, faqs],
+                lambda: self._chunk_products(product_catalog, faqs, text_splitter),
+            )
+
+            logger.info(f"Added {added} product documents to vector database")
+            return collection
+
+        except Exception as e:
+            logger.error(f"Error preparing product collection: {e}")
+            raise
+
+    def _chunk_products(
+        self, product_catalog: Dict[str, Any], faqs: Dict[str, Any], text_splitter
+    ) -> Tuple[List[str], List[Dict[str, Any]], List[str]]:
+        """Split products, add-ons, bundles and FAQs into documents"""
+        # Process product catalog
+        product_docs = []
+        product_metadatas = []
+        product_ids = []
+
+        # Process main products, add-ons and bundles
+        for catalog_key, kind, build_text in (
+            ("products", "product", self._product_text),
+            ("addons", "addon", self._addon_text),
+            ("bundles", "bundle", self._bundle_text),
+        ):
+            for i, item in enumerate(product_catalog.get(catalog_key, [])):
+                chunks = merge_small_chunks(
+                    self._split_if_needed(build_text(item), text_splitter)
+                )
+
+                # Metadata shared by every chunk of this item
+                base_meta = {
+                    "type": kind,
+                    f"{kind}_id": item.get("id", ""),
+                    f"{kind}_name": item.get("name", ""),
+                }
+                id_prefix = f"{kind}-{base_meta[kind + '_id']}-"
+
+                for j, chunk in enumerate(chunks):
+                    product_docs.append(chunk)
+                    meta = base_meta.copy()
+                    meta["chunk"] = f"{i}-{j}"
+                    product_metadatas.append(meta)
+                    product_ids.append(id_prefix + str(j))
+
+        # Process FAQs
+        for i, category in enumerate(faqs.get("categories", [])):
+            category_name = category.get("name", "")
+            base_meta = {"type": "faq", "category": category_name}
+
+            for j, question in enumerate(category.get("questions", [])):
+                faq_text = f"""
+                    Category: {category_name}
+                    Question: {question.get('question')}
+                    Answer: {question.get('answer')}
+                    """
+                chunks = merge_small_chunks(self._split_if_needed(faq_text, text_splitter))
+                id_prefix = f"faq-{i}-{j}-"
+
+                for k, chunk in enumerate(chunks):
+                    product_docs.append(chunk)
+                    meta = base_meta.copy()
+                    meta["chunk"] = f"{i}-{j}-{k}"
+                    product_metadatas.append(meta)
+                    product_ids.append(id_prefix + str(k))
+
+        return product_docs, product_metadatas, product_ids
+
+    def _prepare_technical_collection(
+        self, tech_docs: str, text_splitter
+    ) -> Indexer:
+        """Prepare vector collection for technical documentation"""
+        try:
+            # Create or get the collection
+            collection = self._get_indexer("technical")
+
+            # Check if collection already has documents
+            if collection.count() > 0:
+                logger.info(
+                    "Technical documentation collection already populated, skipping"
+                )
+                return collection
+
+            added = self._populate_collection(
+                collection,
+                tech_docs,
+                lambda: self._chunk_technical(tech_docs, text_splitter),
+            )
+
+            logger.info(f"Added {added} technical documents to vector database")
+            return collection
+
+        except Exception as e:
+            logger.error(f"Error preparing technical collection: {e}")
+            raise
 
-            # Process main products
-            for i, product in enumerate(product_catalog.get("products", [])):
-                # Main product information
-                product_text = f"""
+    def _product_text(self, product: Dict[str, Any]) -> str:
+        """Main product information as document text"""
+        return f"""
                 Product: {product.get('name')}
                 ID: {product.get('id')}
                 Description: {product.get('description')}
@@ -145,23 +624,10 @@ class DataManager:
                 
                 Target Audience: {product.get('target_audience', 'Not specified')}
                 """
-                chunks = text_splitter.split_text(product_text)
 
-                for j, chunk in enumerate(chunks):
-                    product_docs.append(chunk)
-                    product_metadatas.append(
-                        {
-                            "type": "product",
-                            "product_id": product.get("id", ""),
-                            "product_name": product.get("name", ""),
-                            "chunk": f"{i}-{j}",
-                        }
-                    )
-                    product_ids.append(f"product-{product.get('id', '')}-{j}")
-
-            # Process add-ons
-            for i, addon in enumerate(product_catalog.get("addons", [])):
-                addon_text = f"""
+    def _addon_text(self, addon: Dict[str, Any]) -> str:
+        """Add-on information as document text"""
+        return f"""
                 Add-on: {addon.get('name')}
                 ID: {addon.get('id')}
                 Description: {addon.get('description')}
@@ -170,23 +636,10 @@ class DataManager:
                 
                 Details: {addon.get('details', 'No additional details')}
                 """
-                chunks = text_splitter.split_text(addon_text)
-
-                for j, chunk in enumerate(chunks):
-                    product_docs.append(chunk)
-                    product_metadatas.append(
-                        {
-                            "type": "addon",
-                            "addon_id": addon.get("id", ""),
-                            "addon_name": addon.get("name", ""),
-                            "chunk": f"{i}-{j}",
-                        }
-                    )
-                    product_ids.append(f"addon-{addon.get('id', '')}-{j}")
 
-            # Process bundles
-            for i, bundle in enumerate(product_catalog.get("bundles", [])):
-                bundle_text = f"""
+    def _bundle_text(self, bundle: Dict[str, Any]) -> str:
+        """Bundle information as document text"""
+        return f"""
                 Bundle: {bundle.get('name')}
                 ID: {bundle.get('id')}
                 Description: {bundle.get('description')}
@@ -198,179 +651,263 @@ class DataManager:
                 Annual: ${bundle.get('price', {}).get('annual', 'N/A')}
                 Savings: {bundle.get('price', {}).get('saving_percentage', 'N/A')}%
                 """
-                chunks = text_splitter.split_text(bundle_text)
-
-                for j, chunk in enumerate(chunks):
-                    product_docs.append(chunk)
-                    product_metadatas.append(
-                        {
-                            "type": "bundle",
-                            "bundle_id": bundle.get("id", ""),
-                            "bundle_name": bundle.get("name", ""),
-                            "chunk": f"{i}-{j}",
-                        }
-                    )
-                    product_ids.append(f"bundle-{bundle.get('id', '')}-{j}")
-
-            # Process FAQs
-            for i, category in enumerate(faqs.get("categories", [])):
-                category_name = category.get("name", "")
-
-                for j, question in enumerate(category.get("questions", [])):
-                    faq_text = f"""
-                    Category: {category_name}
-                    Question: {question.get('question')}
-                    Answer: {question.get('answer')}
-                    """
-                    chunks = text_splitter.split_text(faq_text)
-
-                    for k, chunk in enumerate(chunks):
-                        product_docs.append(chunk)
-                        product_metadatas.append(
-                            {
-                                "type": "faq",
-                                "category": category_name,
-                                "chunk": f"{i}-{j}-{k}",
-                            }
-                        )
-                        product_ids.append(f"faq-{i}-{j}-{k}")
-
-            # Add documents to collection
-            collection.add(
-                documents=product_docs, metadatas=product_metadatas, ids=product_ids
-            )
 
-            logger.info(
-                f"Added {len(product_docs)} product documents to vector database"
+    def _chunk_technical(
+        self, tech_docs: str, text_splitter
+    ) -> Tuple[List[str], List[Dict[str, Any]], List[str]]:
+        """Split technical documentation into documents"""
+        # Split documentation into chunks
+        chunks = merge_small_chunks(self._split_if_needed(tech_docs, text_splitter))
+
+        tech_docs = []
+        tech_metadatas = []
+        tech_ids = []
+
+        for i, chunk in enumerate(chunks):
+            # Extract section title if possible (simplified approach): the
+            # first subheading, otherwise the last top-level heading
+            section_title = "Technical Documentation"
+            for heading in _HEADING_RE.finditer(chunk):
+                section_title = heading.group(0).strip("# ")
+                if len(heading.group(1)) >= 2:
+                    break
+
+            tech_docs.append(chunk)
+            tech_metadatas.append(
+                {"type": "technical_doc", "section": section_title, "chunk": f"{i}"}
             )
-            return collection
+            tech_ids.append("tech-" + str(i))
 
-        except Exception as e:
-            logger.error(f"Error preparing product collection: {e}")
-            raise
+        return tech_docs, tech_metadatas, tech_ids
 
-    def _prepare_technical_collection(
-        self, tech_docs: str, text_splitter
-    ) -> Collection:
-        """Prepare vector collection for technical documentation"""
+    def _prepare_conversations_collection(
+        self, conversations: List[Dict[str, Any]], text_splitter
+    ) -> Indexer:
+        """Prepare vector collection for customer conversations"""
         try:
             # Create or get the collection
-            collection = self.chroma_client.get_or_create_collection("technical")
+            collection = self._get_indexer("conversations")
 
             # Check if collection already has documents
             if collection.count() > 0:
-                logger.info(
-                    "Technical documentation collection already populated, skipping"
-                )
+                logger.info("Conversations collection already populated, skipping")
                 return collection
 
-            # Split documentation into chunks
-            html_doc = markdown.markdown(tech_docs)
-            chunks = text_splitter.split_text(tech_docs)
-
-            tech_docs = []
-            tech_metadatas = []
-            tech_ids = []
-
-            for i, chunk in enumerate(chunks):
-                # Extract section title if possible (simplified approach)
-                lines = chunk.split("\n")
-                section_title = "Technical Documentation"
-                for line in lines:
-                    if line.startswith("##"):
-                        section_title = line.strip("# ")
-                        break
-                    elif line.startswith("#"):
-                        section_title = line.strip("# ")
-
-                tech_docs.append(chunk)
-                tech_metadatas.append(
-                    {"type": "technical_doc", "section": section_title, "chunk": f"{i}"}
-                )
-                tech_ids.append(f"tech-{i}")
-
-            # Add documents to collection
-            collection.add(documents=tech_docs, metadatas=tech_metadatas, ids=tech_ids)
-
-            logger.info(
-                f"Added {len(tech_docs)} technical documents to vector database"
+            added = self._populate_collection(
+                collection,
+                conversations,
+                lambda: self._chunk_conversations(conversations, text_splitter),
             )
+
+            logger.info(f"Added {added} conversation documents to vector database")
             return collection
 
         except Exception as e:
-            logger.error(f"Error preparing technical collection: {e}")
+            logger.error(f"Error preparing conversations collection: {e}")
             raise
 
-    def _prepare_conversations_collection(
+    def _chunk_conversations(
         self, conversations: List[Dict[str, Any]], text_splitter
-    ) -> Collection:
-        """Prepare vector collection for customer conversations"""
+    ) -> Tuple[List[str], List[Dict[str, Any]], List[str]]:
+        """Split customer conversations into documents"""
+        conv_docs = []
+        conv_metadatas = []
+        conv_ids = []
+
+        for i, conversation in enumerate(conversations):
+            # Format full conversation
+            conv_text = f"Conversation ID: {conversation.get('conversation_id')}\n"
+            conv_text += f"Customer: {conversation.get('customer_email')}\n"
+            conv_text += f"Agent: {conversation.get('agent_name')}\n\n"
+
+            for j, message in enumerate(conversation.get("messages", [])):
+                role = message.get("role", "")
+                content = message.get("content", "")
+                conv_text += f"{role.capitalize()}: {content}\n\n"
+
+            # Split conversation into chunks
+            chunks = merge_small_chunks(self._split_if_needed(conv_text, text_splitter))
+
+            # Metadata shared by every chunk of this conversation
+            base_meta = {
+                "type": "conversation",
+                "conversation_id": conversation.get("conversation_id", ""),
+                "customer_email": conversation.get("customer_email", ""),
+                "agent_name": conversation.get("agent_name", ""),
+            }
+            id_prefix = f"conv-{base_meta['conversation_id']}-"
+
+            for j, chunk in enumerate(chunks):
+                conv_docs.append(chunk)
+                meta = base_meta.copy()
+                meta["chunk"] = f"{i}-{j}"
+                conv_metadatas.append(meta)
+                conv_ids.append(id_prefix + str(j))
+
+        return conv_docs, conv_metadatas, conv_ids
+
+    def _populate_collection(
+        self,
+        collection: Indexer,
+        source: Any,
+        chunk: Callable[[], Tuple[List[str], List[Dict[str, Any]], List[str]]],
+    ) -> int:
+        """Add chunked and embedded documents to an empty collection.
+
+        Chunks and embeddings are cached on disk, keyed by a hash of the source
+        data and the chunking/embedding configuration, so rebuilding a deleted
+        collection from unchanged data skips both steps.
+        """
+        key = self._chunk_cache_key(collection.name, source)
+        cached = self._load_chunk_cache(key)
+        if cached is not None:
+            docs, metadatas, ids, embeddings = cached
+        else:
+            docs, metadatas, ids = chunk()
+            embeddings = None
+
+        with self._bulk_load():
+            embeddings = self._add_in_batches(
+                collection, docs, metadatas, ids, embeddings
+            )
+        collection.persist()
+
+        if cached is None:
+            self._save_chunk_cache(key, (docs, metadatas, ids, embeddings))
+        return len(docs)
+
+    @contextmanager
+    def _bulk_load(self):
+        """Relax SQLite durability on this thread's Chroma connection while loading.
+
+        A failed setup can simply be re-run, so the rollback journal and fsyncs
+        are skipped. Chroma keeps one connection per thread, so this only
+        affects the calling thread; locking_mode=EXCLUSIVE is not used because
+        it would lock out the threads preparing the other collections.
+        """
+        conn = (
+            self._sqlite_connection()
+            if self.bulk_mode and self.vector_backend == "chroma"
+            else None
+        )
+        if conn is not None:
+            self._execute_pragmas(conn, _BULK_PRAGMAS)
         try:
-            # Create or get the collection
-            collection = self.chroma_client.get_or_create_collection("conversations")
+            yield
+        finally:
+            if conn is not None:
+                self._execute_pragmas(conn, _DEFAULT_PRAGMAS)
 
-            # Check if collection already has documents
-            if collection.count() > 0:
-                logger.info("Conversations collection already populated, skipping")
-                return collection
+    def _sqlite_connection(self):
+        """Get the calling thread's connection to Chroma's SQLite database"""
+        try:
+            return self.chroma_client._server._sysdb._conn_pool.connect()
+        except Exception as e:
+            logger.warning(f"SQLite connection unavailable, bulk mode disabled: {e}")
+            return None
+
+    def _execute_pragmas(self, conn, pragmas: Tuple[str, ...]):
+        for pragma in pragmas:
+            try:
+                conn.execute(f"PRAGMA {pragma}")
+            except Exception as e:
+                logger.warning(f"Failed to apply PRAGMA {pragma}: {e}")
+
+    def _add_in_batches(
+        self,
+        collection: Indexer,
+        docs: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        embeddings: Optional[np.ndarray] = None,
+        batch_size: int = _ADD_BATCH_SIZE,
+    ) -> np.ndarray:
+        """Add documents in slices, embedding each slice unless embeddings are given.
+
+        Embeddings are kept in one contiguous float32 array (one row per
+        document) rather than as lists of Python floats.
+        """
+        if embeddings is None:
+            all_embeddings = np.empty(
+                (len(docs), self.embedding_model.get_sentence_embedding_dimension()),
+                dtype=np.float32,
+            )
+        else:
+            all_embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        for start in range(0, len(docs), batch_size):
+            end = start + batch_size
+            if embeddings is None:
+                all_embeddings[start:end] = self.embedding_model.encode(
+                    docs[start:end],
+                    batch_size=_ENCODE_BATCH_SIZE,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False,
+                )
 
-            conv_docs = []
-            conv_metadatas = []
-            conv_ids = []
+            collection.add(
+                documents=docs[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end],
+                embeddings=all_embeddings[start:end],
+            )
 
-            for i, conversation in enumerate(conversations):
-                # Format full conversation
-                conv_text = f"Conversation ID: {conversation.get('conversation_id')}\n"
-                conv_text += f"Customer: {conversation.get('customer_email')}\n"
-                conv_text += f"Agent: {conversation.get('agent_name')}\n\n"
+        return all_embeddings
 
-                for j, message in enumerate(conversation.get("messages", [])):
-                    role = message.get("role", "")
-                    content = message.get("content", "")
-                    conv_text += f"{role.capitalize()}: {content}\n\n"
+    def _chunk_cache_key(self, collection_name: str, source: Any) -> str:
+        """Hash the source data together with everything that shapes its chunks"""
+        digest = hashlib.sha256(json.dumps(source, sort_keys=True).encode())
+        digest.update(
+            f"|{collection_name}|{self.text_splitter_backend}|1000|200|1100|100"
+            f"|{self.embedding_model_name}".encode()
+        )
+        return digest.hexdigest()
 
-                # Split conversation into chunks
-                chunks = text_splitter.split_text(conv_text)
+    def _chunk_cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".pkl")
 
-                for j, chunk in enumerate(chunks):
-                    conv_docs.append(chunk)
-                    conv_metadatas.append(
-                        {
-                            "type": "conversation",
-                            "conversation_id": conversation.get("conversation_id", ""),
-                            "customer_email": conversation.get("customer_email", ""),
-                            "agent_name": conversation.get("agent_name", ""),
-                            "chunk": f"{i}-{j}",
-                        }
-                    )
-                    conv_ids.append(
-                        f"conv-{conversation.get('conversation_id', '')}-{j}"
-                    )
+    def _load_chunk_cache(self, key: str) -> Optional[Tuple]:
+        return self._read_pickle(self._chunk_cache_path(key))
 
-            # Add documents to collection
-            collection.add(documents=conv_docs, metadatas=conv_metadatas, ids=conv_ids)
+    def _save_chunk_cache(self, key: str, entry: Tuple):
+        self._write_pickle(self._chunk_cache_path(key), entry)
 
-            logger.info(
-                f"Added {len(conv_docs)} conversation documents to vector database"
-            )
-            return collection
+    def _read_pickle(self, path: str) -> Any:
+        """Load a cache file, returning None if it is missing or unreadable"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                cached = pickle.load(f)
+            logger.info(f"Loaded cache file {path}")
+            return cached
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache file {path}: {e}")
+            return None
 
+    def _write_pickle(self, path: str, entry: Any):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a
+            # truncated cache entry behind
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
         except Exception as e:
-            logger.error(f"Error preparing conversations collection: {e}")
-            raise
+            logger.warning(f"Failed to write cache file {path}: {e}")
 
     def _format_features(self, features: List[Dict[str, str]]) -> str:
         """Format product features into a readable string"""
         if not features:
             return "No features specified"
 
-        result = ""
-        for feature in features:
-            name = feature.get("name", "Unnamed Feature")
-            description = feature.get("description", "No description available")
-            result += f"- {name}: {description}\n"
-
-        return result
+        return "".join(
+            f"- {feature.get('name', 'Unnamed Feature')}: "
+            f"{feature.get('description', 'No description available')}\n"
+            for feature in features
+        )
 
     def _format_list(self, items: List[str]) -> str:
         """Format a list of strings into a bullet-point string"""
@@ -0,0 +1,33 @@
+import re
+from typing import Optional
+
+# Structural JSON tokens; escaped pairs are consumed whole so \" never ends a string
+_JSON_TOKEN_RE = re.compile(r'\\.|[{}"]', re.DOTALL)
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """Return the first balanced {...} object in text, or None.
+
+    Single forward pass that tracks brace depth and skips braces inside JSON
+    strings, so stray braces in text after the object don't get included.
+    """
+    depth = 0
+    start = -1
+    in_string = False
+    for match in _JSON_TOKEN_RE.finditer(text):
+        token = match.group()
+        if in_string:
+            if token == '"':
+                in_string = False
+        elif token == '"':
+            # Quotes only delimit strings inside an object, not in prose
+            in_string = depth > 0
+        elif token == "{":
+            if depth == 0:
+                start = match.start()
+            depth += 1
+        elif token == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                return text[start : match.end()]
+    return None
@@ -1,16 +1,18 @@
+import asyncio
 import json
 import logging
 import os
+from contextlib import asynccontextmanager
 from typing import Any, Dict, List, Optional
 
 import uvicorn
 from chromadb import PersistentClient
 from chromadb.config import Settings
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from agent_implementations import LLMUtils
+from agent_implementations import CachedLLMUtils, LLMUtils
 from agent_implementations import AgentOrchestrator
 from data_utils import DataManager  # Add this import
 
@@ -20,55 +22,92 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(title="TechSolutions Support Agent Orchestrator")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+MODEL_NAME = os.getenv("MODEL_NAME", "gemma3:1b")
 
-# Initialize Data Manager
-try:
-    data_manager = DataManager(
-        data_dir=os.getenv("DATA_DIR", "data"),
-        db_dir=os.getenv("DB_DIR", "chroma_db")
-    )
-    logger.info("DataManager initialized successfully")
-    
-    # Load knowledge base and prepare vector DB
-    knowledge_base = data_manager.load_knowledge_base()
-    vector_db = data_manager.prepare_vector_db(knowledge_base)
-    logger.info("Vector databases initialized with collections")
-    
-except Exception as e:
-    logger.error(f"Data initialization failed: {e}")
-    knowledge_base = None
-    vector_db = None
+# Populated by the lifespan handler, not at import time, so that importing
+# this module (uvicorn reloads, extra workers) does not redo the setup work
+data_manager = None
+knowledge_base = None
+vector_db = None
+llm = None
+agent_orchestrator = None
 
 
+def initialize_components():
+    """Set up the data manager, vector DB, LLM and agent orchestrator"""
+    global data_manager, knowledge_base, vector_db, llm, agent_orchestrator
 
-OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-MODEL_NAME = os.getenv("MODEL_NAME", "gemma3:1b")
+    # Initialize Data Manager
+    try:
+        data_manager = DataManager(
+            data_dir=os.getenv("DATA_DIR", "data"),
+            db_dir=os.getenv("DB_DIR", "chroma_db"),
+            text_splitter_backend=os.getenv("TEXT_SPLITTER", "semantic"),
+            vector_backend=os.getenv("VECTOR_BACKEND", "chroma"),
+        )
+        logger.info("DataManager initialized successfully")
+
+        # Load knowledge base and prepare vector DB
+        knowledge_base = data_manager.load_knowledge_base()
+        vector_db = data_manager.prepare_vector_db(knowledge_base)
+        logger.info("Vector databases initialized with collections")
 
+    except Exception as e:
+        logger.error(f"Data initialization failed: {e}")
+        data_manager = None
+        knowledge_base = None
+        vector_db = None
 
-# Initialize LLM utils
-try:
-    llm = LLMUtils(
-        base_url=OLLAMA_BASE_URL,
-        model_name=MODEL_NAME,
-    )
-    logger.info("LLM initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize LLM: {e}")
-    llm = None
-
-# Initialize Agent Orchestrator
-if llm and knowledge_base and vector_db:
-    agent_orchestrator = AgentOrchestrator(
-        llm_utils=llm,
-        knowledge_base=knowledge_base,
-        vector_db=vector_db
-    )
-    logger.info("Agent Orchestrator initialized successfully")
-else:
-    agent_orchestrator = None
-    logger.error("Failed to initialize Agent Orchestrator due to missing components")
+    # Initialize LLM utils
+    try:
+        if data_manager:
+            llm = CachedLLMUtils(
+                base_url=OLLAMA_BASE_URL,
+                model_name=MODEL_NAME,
+                cache_collection=data_manager.get_response_cache_collection(),
+                embedding_function=data_manager.embedding_function,
+            )
+        else:
+            llm = LLMUtils(
+                base_url=OLLAMA_BASE_URL,
+                model_name=MODEL_NAME,
+            )
+        logger.info("LLM initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize LLM: {e}")
+        llm = None
+
+    # Initialize Agent Orchestrator
+    if llm and knowledge_base and vector_db:
+        agent_orchestrator = AgentOrchestrator(
+            llm_utils=llm,
+            knowledge_base=knowledge_base,
+            vector_db=vector_db,
+            query_cache=data_manager.get_query_cache_collection(),
+        )
+        logger.info("Agent Orchestrator initialized successfully")
+    else:
+        agent_orchestrator = None
+        logger.error("Failed to initialize Agent Orchestrator due to missing components")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown"""
+    logger.info("Starting up Support Agent Orchestrator")
+    # Setup is blocking (chunking, embedding), keep it off the event loop
+    await asyncio.to_thread(initialize_components)
+
+    yield
+
+    logger.info("Shutting down Support Agent Orchestrator")
+    if agent_orchestrator:
+        await agent_orchestrator.close()
+
+
+# Initialize FastAPI app
+app = FastAPI(title="TechSolutions Support Agent Orchestrator", lifespan=lifespan)
 
 
 # Define API models
@@ -97,6 +136,18 @@ async def process_customer_query(query: CustomerQuery):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/query/stream")
+async def stream_customer_query(query: CustomerQuery):
+    """Process a customer support query, streaming the response as it is generated"""
+    if not agent_orchestrator:
+        raise HTTPException(status_code=500, detail="System not initialized properly")
+
+    return StreamingResponse(
+        agent_orchestrator.process_query_stream(query.query, query.conversation_id),
+        media_type="text/plain",
+    )
+
+
 # Mock API endpoints for testing
 @app.get("/api/orders/{order_id}")
 async def get_order(order_id: str):
@@ -237,20 +288,6 @@ async def generic_exception_handler(request: Request, exc: Exception):
     )
 
 
-# Application startup event
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Starting up Support Agent Orchestrator")
-    # Add any additional startup tasks here
-
-
-# Application shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Shutting down Support Agent Orchestrator")
-    # Add any cleanup tasks here
-
-
 # Add a simple health check endpoint
 @app.get("/health")
 async def health_check():
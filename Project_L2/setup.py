@@ -19,7 +19,9 @@ def setup_environment():
     os.makedirs("chroma_db", exist_ok=True)
 
     # Initialize data manager
-    data_manager = DataManager()
+    data_manager = DataManager(
+        vector_backend=os.getenv("VECTOR_BACKEND", "chroma"),
+    )
 
     # Load knowledge base
     logger.info("Loading knowledge base...")
@@ -58,7 +60,6 @@ if __name__ == "__main__":
         logger.info("Resetting environment...")
         import shutil
 
-        if os.path.exists("chroma_db"):
-            shutil.rmtree("chroma_db")
+        shutil.rmtree("chroma_db", ignore_errors=True)
 
     setup_environment()
\ No newline at end of file
@@ -1,131 +1,529 @@
 import argparse
+import asyncio
+import hashlib
 import json
 import logging
 import os
+import re
+import sys
 import time
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict, List, Tuple
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+import httpx
+import matplotlib
+
+# Charts are only saved to files, so skip interactive backend detection
+matplotlib.use("Agg")
 
 import matplotlib.pyplot as plt
+import numpy as np
+import orjson
 import pandas as pd
-import requests
 from tabulate import tabulate
 
+# Shared helpers live in the project root, next to the agent implementation
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from json_utils import extract_json_object  # noqa: E402
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# Upper bound on tests in flight at once when running concurrently
+_MAX_CONCURRENT_TESTS = 50
+
+# Connect timeout is short so a dead server fails fast; reads are long because
+# agent and evaluator replies wait on LLM generation
+_HTTP_TIMEOUT = httpx.Timeout(120, connect=5)
+
+# Retries: failed connection attempts are retried by the transport; 502 and 503
+# from the agent API are retried with exponential backoff. A 504 or a read
+# timeout means the agent may still be working on the query, so a retry would
+# only pile another LLM request on top of it
+_CONNECT_RETRIES = 2
+_STATUS_RETRIES = 2
+_RETRY_STATUSES = frozenset({502, 503})
+_RETRY_BACKOFF = 0.2
+
+# Consecutive connection failures after which the agent API is considered down
+_MAX_CONNECTION_FAILURES = 3
+
+# Score fields the evaluator rates from 0 to 10
+_SCORE_KEYS = (
+    "accuracy",
+    "completeness",
+    "relevance",
+    "clarity",
+    "agent_appropriateness",
+)
+
+# Evaluation rubric, sent as the system message. It is identical for every
+# test, so Ollama can reuse its prompt cache and only process the per-test
+# user message
+_EVALUATOR_SYSTEM_PROMPT = """
+You are evaluating an AI agent's response to a customer support query.
+You are given the query, the agent's actual response, the expected patterns
+and the agent type the system routed the query to.
+
+Please evaluate the response based on the following criteria:
+1. Accuracy (0-10): Does the response contain correct information?
+2. Completeness (0-10): Does the response address all aspects of the query?
+3. Relevance (0-10): Is the response focused on answering the specific question?
+4. Clarity (0-10): Is the response clear and easy to understand?
+5. Agent appropriateness (0-10): Was this handled by the appropriate agent type?
+
+Respond with a JSON object containing each score, the total_score (sum of the
+scores), the percentage of the maximum possible score, lists of strengths and
+weaknesses, and whether the response passed.
+"""
+
+# Fixed sections of the evaluator user message, joined around the test's text
+_EVAL_QUERY_HEADER = "QUERY:\n"
+_EVAL_RESPONSE_HEADER = "\n\nACTUAL RESPONSE:\n"
+_EVAL_EXPECTED_HEADER = "\n\nEXPECTED PATTERNS:\n"
+_EVAL_AGENT_HEADER = "\n\nAGENT TYPE:\n"
+
+# Expected outputs with this prefix are regular expressions
+_REGEX_PREFIX = "regex:"
+
+# Response lengths (in characters) the pattern fast path will pass without the
+# evaluator; shorter or longer responses are left to the LLM to judge
+_MIN_FAST_PATH_LENGTH = 20
+_MAX_FAST_PATH_LENGTH = 4000
+
+# Evaluations sent to Ollama at once; matches a typical OLLAMA_NUM_PARALLEL so
+# requests are batched by the server instead of queueing behind each other
+_MAX_CONCURRENT_EVALUATIONS = 8
+
+# JSON schema passed as Ollama's "format" so the evaluator can only emit a
+# well-formed evaluation object (requires Ollama 0.5 or later)
+_EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        **{
+            key: {"type": "integer", "minimum": 0, "maximum": 10}
+            for key in _SCORE_KEYS
+        },
+        "total_score": {"type": "integer", "minimum": 0, "maximum": 50},
+        "percentage": {"type": "number", "minimum": 0, "maximum": 100},
+        "strengths": {"type": "array", "items": {"type": "string"}},
+        "weaknesses": {"type": "array", "items": {"type": "string"}},
+        "passed": {"type": "boolean"},
+    },
+    "required": [
+        *_SCORE_KEYS,
+        "total_score",
+        "percentage",
+        "strengths",
+        "weaknesses",
+        "passed",
+    ],
+}
+
+# Fingerprint of everything fixed in the evaluator request, part of every
+# evaluation cache key so editing the rubric or schema invalidates old entries
+_EVALUATOR_FINGERPRINT = hashlib.sha256(
+    json.dumps(
+        [
+            _EVALUATOR_SYSTEM_PROMPT,
+            _EVALUATION_SCHEMA,
+            _EVAL_QUERY_HEADER,
+            _EVAL_RESPONSE_HEADER,
+            _EVAL_EXPECTED_HEADER,
+            _EVAL_AGENT_HEADER,
+        ],
+        sort_keys=True,
+    ).encode()
+).hexdigest()
+
+
+
+async def _collect_stream(response: httpx.Response) -> str:
+    """Join the generated text of an Ollama /api/chat NDJSON stream.
+
+    The stream is read to the chunk marked done so the pooled connection is
+    returned clean; the caller parses the joined text once.
+    """
+    parts: List[str] = []
+    async for line in response.aiter_lines():
+        if not line:
+            continue
+        chunk = json.loads(line)
+        parts.append(chunk.get("message", {}).get("content", ""))
+        if chunk.get("done"):
+            break
+    return "".join(parts)
+
+
+def _compile_expected_patterns(expected_output: Any) -> Optional[List[re.Pattern]]:
+    """Compile the patterns of a machine-checkable expected output.
+
+    A list is treated as phrases that must all appear, and a string starting
+    with "regex:" as a regular expression; anything else is free text that
+    only the LLM can judge, so None is returned.
+    """
+    if isinstance(expected_output, list):
+        return [
+            re.compile(re.escape(str(phrase)), re.IGNORECASE)
+            for phrase in expected_output
+        ]
+    if isinstance(expected_output, str) and expected_output.startswith(
+        _REGEX_PREFIX
+    ):
+        return [re.compile(expected_output[len(_REGEX_PREFIX) :], re.IGNORECASE)]
+    return None
+
+
+def _fixed_evaluation(
+    score: int, passed: bool, strengths: List[str], weaknesses: List[str]
+) -> Dict[str, Any]:
+    """Evaluation giving every criterion the same score out of 10"""
+    return {
+        **dict.fromkeys(_SCORE_KEYS, score),
+        "total_score": score * len(_SCORE_KEYS),
+        "percentage": score * 10,
+        "strengths": strengths,
+        "weaknesses": weaknesses,
+        "passed": passed,
+    }
+
+
+def _is_valid_evaluation(evaluation: Any) -> bool:
+    """Whether an evaluation has every field the report reads"""
+    return (
+        isinstance(evaluation, dict)
+        and all(
+            isinstance(evaluation.get(key), (int, float))
+            for key in (*_SCORE_KEYS, "percentage")
+        )
+        and "passed" in evaluation
+    )
+
+
+@lru_cache(maxsize=None)
+def _read_test_cases(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Parse a test case file once per process; callers must not mutate it"""
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def _plot_category_results(report: Dict[str, Any], output_path: str):
+    """Bar chart of pass rate and average score per category"""
+    categories = list(report["category_results"].keys())
+    pass_rates = [report["category_results"][c]["pass_rate"] for c in categories]
+    avg_scores = [report["category_results"][c]["avg_score"] for c in categories]
+
+    plt.figure(figsize=(10, 6))
+    x = range(len(categories))
+    width = 0.35
+
+    plt.bar([i - width / 2 for i in x], pass_rates, width, label="Pass Rate (%)")
+    plt.bar([i + width / 2 for i in x], avg_scores, width, label="Avg Score (%)")
+
+    plt.xlabel("Category")
+    plt.ylabel("Percentage")
+    plt.title("Test Results by Category")
+    plt.xticks(x, categories, rotation=45)
+    plt.legend()
+    plt.tight_layout()
+
+    plt.savefig(os.path.join(output_path, "category_results.png"))
+
+
+def _plot_evaluation_radar(report: Dict[str, Any], output_path: str):
+    """Radar chart of the average score for each evaluation criterion"""
+    score_categories = [
+        "Accuracy",
+        "Completeness",
+        "Relevance",
+        "Clarity",
+        "Agent Appropriateness",
+    ]
+    # Scores out of 10 as percentages, in the order of score_categories
+    average_scores = report["summary"]["average_scores"]
+    scores = (
+        np.fromiter(
+            (average_scores[key] for key in _SCORE_KEYS),
+            dtype=np.float64,
+            count=len(_SCORE_KEYS),
+        )
+        * 10.0
+    )
+
+    # Create radar chart; the last angle is 2*pi and the first score is
+    # repeated so the outline closes on its starting point
+    angles = np.linspace(0, 2 * np.pi, len(score_categories) + 1)
+    score_values = np.concatenate([scores, scores[:1]])
+
+    fig, ax = plt.subplots(figsize=(8, 8), subplot_kw=dict(polar=True))
+    ax.plot(angles, score_values, "o-", linewidth=2)
+    ax.fill(angles, score_values, alpha=0.25)
+    ax.set_thetagrids(np.degrees(angles[:-1]), score_categories)
+    ax.set_ylim(0, 100)
+    ax.grid(True)
+    ax.set_title("Evaluation Criteria Scores", size=20, y=1.05)
+
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_path, "evaluation_radar.png"))
+
 
 class AgentTester:
     def __init__(
-        self, api_url: str, ollama_url: str, model_name: str, verbose: bool = False
+        self,
+        api_url: str,
+        ollama_url: str,
+        model_name: str,
+        verbose: bool = False,
+        eval_cache_dir: Optional[str] = os.path.join("test_results", ".eval_cache"),
     ):
         self.api_url = api_url
         self.ollama_url = ollama_url
         self.model_name = model_name
         self.verbose = verbose
-        self.session = requests.Session()
+        # Parsed evaluations are stored here so re-running the suite against
+        # unchanged responses skips the evaluator; None disables the cache
+        self.eval_cache_dir = eval_cache_dir
+        self.eval_cache_stats = {"hits": 0, "misses": 0}
+        self.fast_path_evaluations = 0
+        # Keep-alive connection pools for the agent API and for Ollama, created
+        # by run_tests inside the event loop that uses them
+        self.client: Optional[httpx.AsyncClient] = None
+        self.ollama_client: Optional[httpx.AsyncClient] = None
+        self._evaluation_slots: Optional[asyncio.Semaphore] = None
+
+        # Consecutive agent API connection failures; once the limit is hit the
+        # API is treated as down and remaining tests are skipped
+        self._connection_failures = 0
+        self._api_down = False
+
+        # Tests whose ID occurs once in the run, i.e. single-turn conversations,
+        # and the in-flight or finished API reply for each of their queries
+        self._single_turn_ids: Set[str] = set()
+        self._single_turn_replies: Dict[str, asyncio.Future] = {}
+        self.deduplicated_queries = 0
 
         # Test cases organized by agent type and scenario
         self.test_cases = self._load_test_cases()
 
+        # Compiled patterns of each distinct expected output (None for free
+        # text), built once per suite rather than on every evaluation
+        self.expected_patterns: Dict[str, Optional[List[re.Pattern]]] = {
+            str(test["expected_output"]): _compile_expected_patterns(
+                test["expected_output"]
+            )
+            for tests in self.test_cases.values()
+            for test in tests
+        }
+
         # Track conversation IDs for multi-turn conversations
         self.conversations = {}
 
-        # Results tracking
-        self.results = []
+        # Results tracking. Each result is appended to results_file as it
+        # completes; only the numbers the summary needs are kept in memory,
+        # as parallel columns
+        self.results_file: Optional[str] = None
+        self._reset_totals()
+
+    def _reset_totals(self):
+        """Clear the collected scores before a new run"""
+        # One row per result: the _SCORE_KEYS scores followed by the percentage
+        self._scores: List[Tuple[float, ...]] = []
+        self._categories: List[str] = []
+        self._passed: List[bool] = []
+
+    def _record(self, result: Dict[str, Any], out: BinaryIO):
+        """Append a result to the results file and keep its scores"""
+        out.write(orjson.dumps(result) + b"\n")
+
+        evaluation = result["evaluation"]
+        self._scores.append(
+            (*(evaluation[key] for key in _SCORE_KEYS), evaluation["percentage"])
+        )
+        self._categories.append(result["category"])
+        self._passed.append(bool(evaluation["passed"]))
+
+    def _iter_results(self) -> Iterator[Dict[str, Any]]:
+        """Read the results of the last run back from the results file"""
+        with open(self.results_file, "rb") as f:
+            for line in f:
+                yield orjson.loads(line)
 
     def _load_test_cases(self) -> Dict[str, List[Dict[str, Any]]]:
         """Load test cases from JSON file"""
-        with open("test_cases.json", "r") as f:
-            return json.load(f)
+        return _read_test_cases("test_cases.json")
+
+    def _eval_cache_key(
+        self, query: str, actual: str, expected: str, agent_type: str
+    ) -> str:
+        """Hash of everything the evaluator request depends on"""
+        return hashlib.sha256(
+            json.dumps(
+                [
+                    _EVALUATOR_FINGERPRINT,
+                    self.model_name,
+                    query,
+                    actual,
+                    expected,
+                    agent_type,
+                ],
+                sort_keys=True,
+            ).encode()
+        ).hexdigest()
+
+    def _read_cached_evaluation(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached evaluation for key, or None on a miss or a
+        malformed entry"""
+        try:
+            with open(os.path.join(self.eval_cache_dir, key + ".json"), "rb") as f:
+                evaluation = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+        return evaluation if _is_valid_evaluation(evaluation) else None
+
+    def _write_cached_evaluation(self, key: str, evaluation: Dict[str, Any]):
+        """Store an evaluation; written to a temp file first so concurrent
+        runs never read a partial entry"""
+        try:
+            os.makedirs(self.eval_cache_dir, exist_ok=True)
+            path = os.path.join(self.eval_cache_dir, key + ".json")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps(evaluation))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to cache evaluation: {e}")
+
+    def _expected_patterns(
+        self, expected_output: Any
+    ) -> Optional[List[re.Pattern]]:
+        """Look up the compiled patterns for an expected output"""
+        key = str(expected_output)
+        if key not in self.expected_patterns:
+            self.expected_patterns[key] = _compile_expected_patterns(expected_output)
+        return self.expected_patterns[key]
+
+    def _fast_path_evaluation(
+        self,
+        actual_response: str,
+        expected_output: Any,
+        agent_type: str,
+        expected_agent: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Score responses that need no LLM judgement, or return None.
+
+        Empty responses fail outright. A response of reasonable length from
+        the expected agent that matches every expected pattern passes with
+        full marks; patterns are either a list of phrases or a "regex:"
+        prefixed expression. Responses from any other agent are left to the
+        evaluator, which scores the routing.
+        """
+        if not actual_response.strip():
+            return _fixed_evaluation(0, False, [], ["Empty response"])
+
+        patterns = self._expected_patterns(expected_output)
+        if (
+            patterns
+            and agent_type.lower() == expected_agent.lower()
+            and _MIN_FAST_PATH_LENGTH <= len(actual_response) <= _MAX_FAST_PATH_LENGTH
+            and all(pattern.search(actual_response) for pattern in patterns)
+        ):
+            return _fixed_evaluation(
+                10, True, ["Matches all expected patterns"], []
+            )
+        return None
 
-    def _evaluate_response(
+    async def _evaluate_response(
         self,
         query: str,
         actual_response: str,
         expected_output: str,
         criteria: Dict[str, Any],
         agent_type: str,
+        expected_agent: str,
     ) -> Dict[str, Any]:
         """Use the LLM to evaluate a response against expected criteria"""
-        prompt = f"""
-        You are evaluating an AI agent's response to a customer support query.
-
-        QUERY:
-        {query}
-
-        ACTUAL RESPONSE:
-        {actual_response}
-
-        EXPECTED PATTERNS:
-        {expected_output}
-
-        Please evaluate the response based on the following criteria:
-        1. Accuracy (0-10): Does the response contain correct information?
-        2. Completeness (0-10): Does the response address all aspects of the query?
-        3. Relevance (0-10): Is the response focused on answering the specific question?
-        4. Clarity (0-10): Is the response clear and easy to understand?
-        5. Agent appropriateness (0-10): Was this handled by the appropriate agent type? The system identified it as "{agent_type}".
-
-        Respond with a JSON object containing:
-        {{
-            "accuracy": score,
-            "completeness": score,
-            "relevance": score,
-            "clarity": score,
-            "agent_appropriateness": score,
-            "total_score": sum_of_scores,
-            "percentage": percentage_of_max_possible,
-            "strengths": ["list", "of", "strengths"],
-            "weaknesses": ["list", "of", "weaknesses"],
-            "passed": true/false
-        }}
-        
-        Only respond with the JSON, nothing else.
-        """
-
-        try:
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={"model": self.model_name, "prompt": prompt},
+        # Trivial cases are scored without the evaluator
+        evaluation = self._fast_path_evaluation(
+            actual_response, expected_output, agent_type, expected_agent
+        )
+        if evaluation is not None:
+            self.fast_path_evaluations += 1
+            return evaluation
+
+        cache_key = None
+        if self.eval_cache_dir is not None:
+            cache_key = self._eval_cache_key(
+                query, actual_response, str(expected_output), agent_type
+            )
+            cached = self._read_cached_evaluation(cache_key)
+            if cached is not None:
+                self.eval_cache_stats["hits"] += 1
+                return cached
+            self.eval_cache_stats["misses"] += 1
+
+        prompt = "".join(
+            (
+                _EVAL_QUERY_HEADER,
+                query,
+                _EVAL_RESPONSE_HEADER,
+                actual_response,
+                _EVAL_EXPECTED_HEADER,
+                str(expected_output),
+                _EVAL_AGENT_HEADER,
+                agent_type,
             )
-            response.raise_for_status()
+        )
 
-            # Extract the generated text
-            llm_response = response.json().get("response", "")
+        try:
+            # Stream the reply so it is read as it is generated rather than
+            # waiting on one response at the end
+            async with self._evaluation_slots, self.ollama_client.stream(
+                "POST",
+                f"{self.ollama_url}/api/chat",
+                json={
+                    "model": self.model_name,
+                    "messages": [
+                        {"role": "system", "content": _EVALUATOR_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt},
+                    ],
+                    # Constrain decoding to the schema so the reply is always
+                    # bare JSON; temperature 0 keeps the scores repeatable
+                    "format": _EVALUATION_SCHEMA,
+                    "stream": True,
+                    "options": {"temperature": 0},
+                    # Keep the evaluator loaded between tests and runs
+                    "keep_alive": "1h",
+                },
+            ) as response:
+                response.raise_for_status()
+                llm_response = await _collect_stream(response)
 
-            # Parse the JSON response
+            # Parse the JSON response. JSON mode should return a bare object,
+            # but servers that ignore "format" may wrap it in prose
             try:
-                # Find the JSON object in the response
-                json_str = llm_response.strip()
-                if not json_str.startswith("{"):
-                    # Try to find JSON in the response
-                    start_idx = llm_response.find("{")
-                    end_idx = llm_response.rfind("}") + 1
-                    if start_idx >= 0 and end_idx > start_idx:
-                        json_str = llm_response[start_idx:end_idx]
-
-                evaluation = json.loads(json_str)
-                return evaluation
+                evaluation = json.loads(
+                    extract_json_object(llm_response) or llm_response
+                )
             except json.JSONDecodeError as e:
                 logger.error(
                     f"Failed to parse evaluation response: {e}\nResponse: {llm_response}"
                 )
-                return {
-                    "accuracy": 0,
-                    "completeness": 0,
-                    "relevance": 0,
-                    "clarity": 0,
-                    "agent_appropriateness": 0,
-                    "total_score": 0,
-                    "percentage": 0,
-                    "strengths": [],
-                    "weaknesses": ["Failed to evaluate response"],
-                    "passed": False,
-                }
+                return _fixed_evaluation(0, False, [], ["Failed to evaluate response"])
+
+            # Malformed evaluations are neither cached nor reported
+            if not _is_valid_evaluation(evaluation):
+                logger.error(f"Evaluation is missing scores\nResponse: {llm_response}")
+                return _fixed_evaluation(0, False, [], ["Failed to evaluate response"])
+
+            if cache_key is not None:
+                self._write_cached_evaluation(cache_key, evaluation)
+            return evaluation
         except Exception as e:
             logger.error(f"Error evaluating response: {e}")
             return {
@@ -141,13 +539,56 @@ class AgentTester:
                 "passed": False,
             }
 
-    def run_test(self, test_case: Dict[str, Any]) -> Dict[str, Any]:
+    async def _post_query(self, payload: Dict[str, Any]) -> httpx.Response:
+        """POST to the agent API, retrying 502 and 503 responses with backoff"""
+        for attempt in range(_STATUS_RETRIES + 1):
+            response = await self.client.post(f"{self.api_url}/api/query", json=payload)
+            if (
+                response.status_code not in _RETRY_STATUSES
+                or attempt == _STATUS_RETRIES
+            ):
+                return response
+            await asyncio.sleep(_RETRY_BACKOFF * 2**attempt)
+
+    async def _query_agent(self, query: str, conversation_id: str) -> Dict[str, Any]:
+        """Send a query to the agent API and return its parsed reply"""
+        try:
+            response = await self._post_query(
+                {"query": query, "conversation_id": conversation_id}
+            )
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            self._connection_failures += 1
+            if self._connection_failures >= _MAX_CONNECTION_FAILURES:
+                logger.error("Agent API unreachable, skipping remaining tests")
+                self._api_down = True
+            raise
+        self._connection_failures = 0
+        response.raise_for_status()
+        return response.json()
+
+    async def run_test(self, test_case: Dict[str, Any]) -> Dict[str, Any]:
         """Run a single test case and evaluate the response"""
         query = test_case["query"]
         expected_output = test_case["expected_output"]
         category = test_case["category"]
         test_id = test_case["id"]
         criteria = test_case.get("criteria", {})
+        # Categories are named after the agent that should answer them
+        expected_agent = test_case.get("expected_agent", category)
+
+        # The agent API is down, don't wait out a timeout for every test
+        if self._api_down:
+            return {
+                "id": test_id,
+                "category": category,
+                "query": query,
+                "expected_output": expected_output,
+                "actual_response": "Skipped: agent API unreachable",
+                "agent_type": "skipped",
+                "evaluation": _fixed_evaluation(
+                    0, False, [], ["Skipped: agent API unreachable"]
+                ),
+            }
 
         # Generate a conversation ID for this test if not already present
         if test_id not in self.conversations:
@@ -155,14 +596,24 @@ class AgentTester:
 
         # Send the query to the API
         try:
-            response = self.session.post(
-                f"{self.api_url}/api/query",
-                json={"query": query, "conversation_id": self.conversations[test_id]},
-            )
-            response.raise_for_status()
+            if test_id in self._single_turn_ids:
+                # A standalone query gets the same answer whichever conversation
+                # it starts, so identical ones share a single API call
+                reply = self._single_turn_replies.get(query)
+                if reply is None:
+                    reply = asyncio.ensure_future(
+                        self._query_agent(query, self.conversations[test_id])
+                    )
+                    self._single_turn_replies[query] = reply
+                else:
+                    self.deduplicated_queries += 1
+                api_response = await reply
+            else:
+                api_response = await self._query_agent(
+                    query, self.conversations[test_id]
+                )
 
             # Parse the response
-            api_response = response.json()
             actual_response = api_response.get("response", "")
             agent_type = api_response.get("agent", "unknown")
 
@@ -173,8 +624,13 @@ class AgentTester:
                 logger.info(f"Response (from {agent_type}):\n{actual_response}")
 
             # Evaluate the response
-            evaluation = self._evaluate_response(
-                query, actual_response, expected_output, criteria, agent_type
+            evaluation = await self._evaluate_response(
+                query,
+                actual_response,
+                expected_output,
+                criteria,
+                agent_type,
+                expected_agent,
             )
 
             # Create the result entry
@@ -212,84 +668,139 @@ class AgentTester:
                 },
             }
 
-    def run_tests(self, categories: List[str] = None, concurrent: bool = False):
-        """Run all test cases, optionally filtering by category"""
-        all_tests = []
+    def run_tests(
+        self,
+        categories: List[str] = None,
+        concurrent: bool = False,
+        results_file: str = os.path.join("test_results", "results.jsonl"),
+    ):
+        """Run all test cases, optionally filtering by category.
 
-        # Flatten the test cases and filter by category if specified
-        for category, tests in self.test_cases.items():
-            if categories is None or category in categories:
-                for test in tests:
-                    test["category"] = category
-                    all_tests.append(test)
+        Results are written to results_file as JSON lines as they complete.
+        """
+        # Flatten the test cases and filter by category if specified. Tests
+        # are copied so the cached test cases are never modified
+        all_tests = [
+            dict(test, category=category)
+            for category, tests in self.test_cases.items()
+            if categories is None or category in categories
+            for test in tests
+        ]
 
         logger.info(f"Running {len(all_tests)} tests...")
-
-        # Run tests concurrently or sequentially
-        if concurrent:
-            with ThreadPoolExecutor(max_workers=5) as executor:
-                self.results = list(executor.map(self.run_test, all_tests))
-        else:
-            self.results = [self.run_test(test) for test in all_tests]
-
+        os.makedirs(os.path.dirname(results_file) or ".", exist_ok=True)
+        self.results_file = results_file
+        self._reset_totals()
+        self._connection_failures = 0
+        self._api_down = False
+
+        # Tests sharing an ID form a multi-turn conversation; only the others
+        # can have their queries answered by another test's API call
+        turns = Counter(test["id"] for test in all_tests)
+        self._single_turn_ids = {test_id for test_id, n in turns.items() if n == 1}
+        self._single_turn_replies = {}
+        self.deduplicated_queries = 0
+
+        with open(results_file, "wb") as out:
+            asyncio.run(self._run_all(all_tests, concurrent, out))
         logger.info("Testing completed")
+        logger.info(
+            "Evaluations decided without the LLM: %d", self.fast_path_evaluations
+        )
+        logger.info(
+            "Duplicate queries answered without an API call: %d",
+            self.deduplicated_queries,
+        )
+        if self.eval_cache_dir is not None:
+            logger.info(
+                "Evaluation cache: %d hits, %d misses",
+                self.eval_cache_stats["hits"],
+                self.eval_cache_stats["misses"],
+            )
+
+    async def _run_all(
+        self, all_tests: List[Dict[str, Any]], concurrent: bool, out: BinaryIO
+    ):
+        """Run the tests on pooled HTTP clients, concurrently or in order"""
+        limits = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+        # Evaluations are long-lived streams, so Ollama gets its own pool and
+        # they never hold connections the agent API calls are waiting for
+        ollama_limits = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+        client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(limits=limits, retries=_CONNECT_RETRIES),
+            timeout=_HTTP_TIMEOUT,
+        )
+        ollama_client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                limits=ollama_limits, retries=_CONNECT_RETRIES
+            ),
+            timeout=_HTTP_TIMEOUT,
+        )
+        async with client, ollama_client:
+            self.client = client
+            self.ollama_client = ollama_client
+            self._evaluation_slots = asyncio.Semaphore(_MAX_CONCURRENT_EVALUATIONS)
+            try:
+                if not concurrent:
+                    for test in all_tests:
+                        self._record(await self.run_test(test), out)
+                    return
+
+                # Tests are I/O bound, so a single event loop can keep many of
+                # them in flight; the semaphore keeps the servers from being
+                # flooded
+                semaphore = asyncio.Semaphore(_MAX_CONCURRENT_TESTS)
+
+                async def bounded(test: Dict[str, Any]):
+                    async with semaphore:
+                        self._record(await self.run_test(test), out)
+
+                await asyncio.gather(*(bounded(test) for test in all_tests))
+            finally:
+                self.client = None
+                self.ollama_client = None
+                self._evaluation_slots = None
 
     def generate_report(self, output_path: str = "test_results"):
         """Generate a comprehensive test report"""
-        if not self.results:
+        if not self._scores:
             logger.error("No test results available. Run tests first.")
             return
 
         # Create output directory if it doesn't exist
         os.makedirs(output_path, exist_ok=True)
 
-        # Generate summary statistics
-        total_tests = len(self.results)
-        passed_tests = sum(1 for r in self.results if r["evaluation"]["passed"])
+        # Generate summary statistics. Scores are at most 10 or 100, so float32
+        # storage is exact enough; the means accumulate in float64
+        scores = np.asarray(self._scores, dtype=np.float32)
+        passed = np.asarray(self._passed, dtype=bool)
+        total_tests = len(scores)
+        passed_tests = int(np.count_nonzero(passed))
         pass_rate = passed_tests / total_tests * 100 if total_tests > 0 else 0
 
-        avg_scores = {
-            "accuracy": sum(r["evaluation"]["accuracy"] for r in self.results)
-            / total_tests,
-            "completeness": sum(r["evaluation"]["completeness"] for r in self.results)
-            / total_tests,
-            "relevance": sum(r["evaluation"]["relevance"] for r in self.results)
-            / total_tests,
-            "clarity": sum(r["evaluation"]["clarity"] for r in self.results)
-            / total_tests,
-            "agent_appropriateness": sum(
-                r["evaluation"]["agent_appropriateness"] for r in self.results
+        means = scores.mean(axis=0, dtype=np.float64).tolist()
+        avg_scores = dict(zip(_SCORE_KEYS, means))
+        avg_scores["overall"] = means[-1]
+
+        # Results by category, with the rates computed column-wise in one go
+        categories = (
+            pd.DataFrame(
+                {
+                    "category": self._categories,
+                    "passed": passed,
+                    "score": scores[:, -1].astype(np.float64),
+                }
             )
-            / total_tests,
-            "overall": sum(r["evaluation"]["percentage"] for r in self.results)
-            / total_tests,
-        }
-
-        # Results by category
-        category_results = {}
-        for result in self.results:
-            category = result["category"]
-            if category not in category_results:
-                category_results[category] = {"total": 0, "passed": 0, "score": 0}
-
-            category_results[category]["total"] += 1
-            if result["evaluation"]["passed"]:
-                category_results[category]["passed"] += 1
-            category_results[category]["score"] += result["evaluation"]["percentage"]
-
-        # Calculate averages
-        for category in category_results:
-            total = category_results[category]["total"]
-            if total > 0:
-                category_results[category]["pass_rate"] = (
-                    category_results[category]["passed"] / total * 100
-                )
-                category_results[category]["avg_score"] = (
-                    category_results[category]["score"] / total
-                )
-            else:
-                category_results[category]["pass_rate"] = 0
-                category_results[category]["avg_score"] = 0
+            .groupby("category", sort=False)
+            .agg(
+                total=("passed", "size"),
+                passed=("passed", "sum"),
+                score=("score", "sum"),
+            )
+        )
+        categories["pass_rate"] = categories["passed"] / categories["total"] * 100
+        categories["avg_score"] = categories["score"] / categories["total"]
+        category_results = categories.to_dict("index")
 
         # Create detailed report
         report = {
@@ -300,147 +811,114 @@ class AgentTester:
                 "average_scores": avg_scores,
             },
             "category_results": category_results,
-            "test_results": self.results,
         }
 
-        # Write JSON report
-        with open(os.path.join(output_path, "test_results.json"), "w") as f:
-            json.dump(report, f, indent=2)
-
-        # Generate human-readable summary
-        with open(os.path.join(output_path, "summary_report.md"), "w") as f:
-            f.write("# Automated Test Results Summary\n\n")
-
-            f.write("## Overall Summary\n\n")
-            f.write(f"- Total Tests: {total_tests}\n")
-            f.write(f"- Passed Tests: {passed_tests}\n")
-            f.write(f"- Pass Rate: {pass_rate:.2f}%\n\n")
-
-            f.write("## Average Scores\n\n")
-            f.write(f"- Accuracy: {avg_scores['accuracy']:.2f}/10\n")
-            f.write(f"- Completeness: {avg_scores['completeness']:.2f}/10\n")
-            f.write(f"- Relevance: {avg_scores['relevance']:.2f}/10\n")
-            f.write(f"- Clarity: {avg_scores['clarity']:.2f}/10\n")
-            f.write(
-                f"- Agent Appropriateness: {avg_scores['agent_appropriateness']:.2f}/10\n"
+        # Render the charts in worker processes while the reports are written;
+        # matplotlib is CPU bound and would otherwise run after everything else
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            charts = [
+                pool.submit(_plot_category_results, report, output_path),
+                pool.submit(_plot_evaluation_radar, report, output_path),
+            ]
+
+            # Write JSON report
+            self._write_json_report(
+                os.path.join(output_path, "test_results.json"), report
             )
-            f.write(f"- Overall Score: {avg_scores['overall']:.2f}%\n\n")
-
-            f.write("## Results by Category\n\n")
-
-            categories_table = []
-            for category, results in category_results.items():
-                categories_table.append(
-                    [
-                        category,
-                        f"{results['passed']}/{results['total']}",
-                        f"{results['pass_rate']:.2f}%",
-                        f"{results['avg_score']:.2f}%",
-                    ]
-                )
 
-            f.write(
+            # Generate human-readable summary, built in memory and written once
+            categories_table = [
+                [
+                    category,
+                    f"{results['passed']}/{results['total']}",
+                    f"{results['pass_rate']:.2f}%",
+                    f"{results['avg_score']:.2f}%",
+                ]
+                for category, results in category_results.items()
+            ]
+
+            summary = [
+                "# Automated Test Results Summary\n\n"
+                "## Overall Summary\n\n"
+                f"- Total Tests: {total_tests}\n"
+                f"- Passed Tests: {passed_tests}\n"
+                f"- Pass Rate: {pass_rate:.2f}%\n\n"
+                "## Average Scores\n\n"
+                f"- Accuracy: {avg_scores['accuracy']:.2f}/10\n"
+                f"- Completeness: {avg_scores['completeness']:.2f}/10\n"
+                f"- Relevance: {avg_scores['relevance']:.2f}/10\n"
+                f"- Clarity: {avg_scores['clarity']:.2f}/10\n"
+                "- Agent Appropriateness: "
+                f"{avg_scores['agent_appropriateness']:.2f}/10\n"
+                f"- Overall Score: {avg_scores['overall']:.2f}%\n\n"
+                "## Results by Category\n\n",
                 tabulate(
                     categories_table,
                     headers=["Category", "Passed/Total", "Pass Rate", "Avg Score"],
                     tablefmt="pipe",
-                )
-            )
-            f.write("\n\n")
-
-            f.write("## Failed Tests\n\n")
-            failed_tests = [r for r in self.results if not r["evaluation"]["passed"]]
-
-            if failed_tests:
-                for i, test in enumerate(failed_tests, 1):
-                    f.write(f"### {i}. Test ID: {test['id']} ({test['category']})\n\n")
-                    f.write(f"**Query:** {test['query']}\n\n")
-                    f.write(f"**Agent:** {test['agent_type']}\n\n")
-                    f.write("**Weaknesses:**\n")
-                    for weakness in test["evaluation"]["weaknesses"]:
-                        f.write(f"- {weakness}\n")
-                    f.write("\n")
-                    f.write(f"**Score:** {test['evaluation']['percentage']:.2f}%\n\n")
-                    f.write("---\n\n")
-            else:
-                f.write("No failed tests! 🎉\n\n")
-
-        # Generate visual report
-        self._generate_visual_report(output_path, report)
-
-        logger.info(f"Report generated in {output_path}")
-
-        return report["summary"]["average_scores"]["overall"]
-
-    def _generate_visual_report(self, output_path: str, report: Dict[str, Any]):
-        """Generate visual representations of test results"""
-        try:
-            # Create category results chart
-            categories = list(report["category_results"].keys())
-            pass_rates = [
-                report["category_results"][c]["pass_rate"] for c in categories
-            ]
-            avg_scores = [
-                report["category_results"][c]["avg_score"] for c in categories
+                ),
+                "\n\n## Failed Tests\n\n",
             ]
 
-            plt.figure(figsize=(10, 6))
-            x = range(len(categories))
-            width = 0.35
+            failed_count = 0
+            for test in self._iter_results():
+                evaluation = test["evaluation"]
+                if evaluation["passed"]:
+                    continue
+                failed_count += 1
+                weaknesses = "".join(
+                    f"- {weakness}\n" for weakness in evaluation["weaknesses"]
+                )
+                summary.append(
+                    f"### {failed_count}. Test ID: {test['id']} "
+                    f"({test['category']})\n\n"
+                    f"**Query:** {test['query']}\n\n"
+                    f"**Agent:** {test['agent_type']}\n\n"
+                    f"**Weaknesses:**\n{weaknesses}\n"
+                    f"**Score:** {evaluation['percentage']:.2f}%\n\n"
+                    "---\n\n"
+                )
 
-            plt.bar(
-                [i - width / 2 for i in x], pass_rates, width, label="Pass Rate (%)"
-            )
-            plt.bar(
-                [i + width / 2 for i in x], avg_scores, width, label="Avg Score (%)"
-            )
+            if not failed_count:
+                summary.append("No failed tests! 🎉\n\n")
 
-            plt.xlabel("Category")
-            plt.ylabel("Percentage")
-            plt.title("Test Results by Category")
-            plt.xticks(x, categories, rotation=45)
-            plt.legend()
-            plt.tight_layout()
-
-            plt.savefig(os.path.join(output_path, "category_results.png"))
-
-            # Create radar chart for average scores
-            score_categories = [
-                "Accuracy",
-                "Completeness",
-                "Relevance",
-                "Clarity",
-                "Agent Appropriateness",
-            ]
-            score_values = [
-                report["summary"]["average_scores"]["accuracy"] / 10 * 100,
-                report["summary"]["average_scores"]["completeness"] / 10 * 100,
-                report["summary"]["average_scores"]["relevance"] / 10 * 100,
-                report["summary"]["average_scores"]["clarity"] / 10 * 100,
-                report["summary"]["average_scores"]["agent_appropriateness"] / 10 * 100,
-            ]
+            with open(os.path.join(output_path, "summary_report.md"), "w") as f:
+                f.write("".join(summary))
 
-            # Create radar chart
-            angles = np.linspace(
-                0, 2 * np.pi, len(score_categories), endpoint=False
-            ).tolist()
-            angles += angles[:1]  # Close the loop
+            # Wait for the visual report
+            for chart in charts:
+                try:
+                    chart.result()
+                except Exception as e:
+                    logger.error(f"Error generating visual report: {e}")
 
-            score_values += score_values[:1]  # Close the loop
+        logger.info(f"Report generated in {output_path}")
 
-            fig, ax = plt.subplots(figsize=(8, 8), subplot_kw=dict(polar=True))
-            ax.plot(angles, score_values, "o-", linewidth=2)
-            ax.fill(angles, score_values, alpha=0.25)
-            ax.set_thetagrids(np.degrees(angles[:-1]), score_categories)
-            ax.set_ylim(0, 100)
-            ax.grid(True)
-            ax.set_title("Evaluation Criteria Scores", size=20, y=1.05)
+        return report["summary"]["average_scores"]["overall"]
 
-            plt.tight_layout()
-            plt.savefig(os.path.join(output_path, "evaluation_radar.png"))
+    def _write_json_report(self, path: str, report: Dict[str, Any]):
+        """Write the report with the results file appended as "test_results".
 
-        except Exception as e:
-            logger.error(f"Error generating visual report: {e}")
+        Results are copied one at a time, so the whole run is never held in
+        memory; the layout matches an indent=2 dump of the full report.
+        """
+        head = orjson.dumps(
+            report, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+        )
+        with open(path, "wb") as f:
+            # Reopen the top-level object to add the results list
+            f.write(head[: -len(b"\n}")])
+            f.write(b',\n  "test_results": [')
+            separator = b"\n    "
+            for result in self._iter_results():
+                f.write(separator)
+                f.write(
+                    orjson.dumps(result, option=orjson.OPT_INDENT_2).replace(
+                        b"\n", b"\n    "
+                    )
+                )
+                separator = b",\n    "
+            f.write(b"\n  ]\n}")
 
 
 def main():
@@ -464,12 +942,29 @@ def main():
     parser.add_argument(
         "--concurrent", action="store_true", help="Run tests concurrently"
     )
+    parser.add_argument(
+        "--no-eval-cache",
+        action="store_true",
+        help="Always call the evaluator instead of reusing cached evaluations",
+    )
 
     args = parser.parse_args()
 
     # Create and run the tester
-    tester = AgentTester(args.api_url, args.ollama_url, args.model, args.verbose)
-    tester.run_tests(args.categories, args.concurrent)
+    tester = AgentTester(
+        args.api_url,
+        args.ollama_url,
+        args.model,
+        args.verbose,
+        eval_cache_dir=(
+            None if args.no_eval_cache else os.path.join(args.output, ".eval_cache")
+        ),
+    )
+    tester.run_tests(
+        args.categories,
+        args.concurrent,
+        results_file=os.path.join(args.output, "results.jsonl"),
+    )
     overall_score = tester.generate_report(args.output)
 
     print(f"\nTesting completed. Overall score: {overall_score:.2f}%")
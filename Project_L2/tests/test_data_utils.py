@@ -0,0 +1,67 @@
+"""Unit tests for chunk merging in data_utils.
+
+Run from Project_L2 with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+from semantic_text_splitter import TextSplitter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from data_utils import merge_small_chunks  # noqa: E402
+
+# Spans this long or longer may only repeat as often as in the source text
+_SPAN_LENGTH = 30
+
+
+def _repeated_span(chunk: str, source: str) -> str:
+    """Return a span occurring more often in chunk than in source, or ''.
+    Whitespace is normalized since merged chunks are joined with newlines."""
+    chunk = " ".join(chunk.split())
+    for start in range(len(chunk) - _SPAN_LENGTH + 1):
+        span = chunk[start : start + _SPAN_LENGTH]
+        if chunk.count(span) > source.count(span):
+            return span
+    return ""
+
+
+class MergeSmallChunksTest(unittest.TestCase):
+    def test_overlapping_prefix_is_dropped(self):
+        chunks = [
+            "Restart the sync client.",
+            "Restart the sync client. Then sign in again.",
+            "Then sign in again. Check the status page.",
+        ]
+
+        self.assertEqual(
+            merge_small_chunks(chunks, min_size=0),
+            ["Restart the sync client.\nThen sign in again.\nCheck the status page."],
+        )
+
+    def test_partial_word_match_is_not_overlap(self):
+        chunks = ["Open the settings tab", "able rows can be reordered"]
+
+        self.assertEqual(
+            merge_small_chunks(chunks, min_size=0),
+            ["Open the settings tab\nable rows can be reordered"],
+        )
+
+    def test_merged_splitter_output_has_no_repeated_span(self):
+        source = " ".join(
+            f"Step {i} sets option_{i} to {i * 7} and restarts service {i % 5}."
+            for i in range(60)
+        )
+        chunks = TextSplitter(150, overlap=60).chunks(source)
+
+        merged = merge_small_chunks(chunks, max_size=400, overlap=60)
+
+        self.assertLess(len(merged), len(chunks))
+        for chunk in merged:
+            self.assertEqual(_repeated_span(chunk, source), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""Unit tests for the AgentOrchestrator's answer cache.
+
+Run from Project_L2 with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from typing import Any, Dict, List
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agent_implementations import AgentOrchestrator, LLMUtils  # noqa: E402
+from test_response_cache import _ERROR_QUERY, _embed  # noqa: E402
+
+_TECHNICAL_ROUTE = {
+    "classification": "Technical",
+    "confidence": 0.9,
+    "requires_clarification": False,
+}
+
+# Distinct fixes per error code, as /api/diagnose returns them
+_SOLUTIONS = {"E1234": "Clear the app cache", "E5678": "Reinstall the driver"}
+
+
+class _FakeQueryCache:
+    """In-memory stand-in for the Chroma query cache collection"""
+
+    def __init__(self):
+        self.rows: Dict[str, Any] = {}
+
+    def query(self, query_texts, n_results, where):
+        embedding = _embed(query_texts)[0]
+        cutoff = where["created_at"]["$gte"]
+        matches = sorted(
+            (
+                (1 - float(np.dot(row_embedding, embedding)), metadata)
+                for row_embedding, metadata in self.rows.values()
+                if metadata["created_at"] >= cutoff
+            ),
+            key=lambda match: match[0],
+        )[:n_results]
+        return {
+            "distances": [[distance for distance, _ in matches]],
+            "metadatas": [[metadata for _, metadata in matches]],
+        }
+
+    def upsert(self, ids, documents, metadatas):
+        self.rows[ids[0]] = (_embed(documents)[0], metadatas[0])
+
+    def delete(self, where):
+        pass
+
+
+class _FakeCollection:
+    """Retrieval collection returning no documents"""
+
+    def query(self, query_texts, n_results, **kwargs):
+        return {"documents": [[] for _ in query_texts]}
+
+
+class _EchoLLM(LLMUtils):
+    """Answers with the prompt it was given, so answers reflect the context"""
+
+    async def _agenerate(self, prompt, system_prompt, cache_query=None):
+        return prompt
+
+
+class QueryCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.query_cache = _FakeQueryCache()
+        self.orchestrator = AgentOrchestrator(
+            _EchoLLM("http://ollama", "model"),
+            {"product_catalog": {}, "faqs": {}, "tech_docs": ""},
+            {"products": _FakeCollection(), "technical": _FakeCollection()},
+            query_cache=self.query_cache,
+        )
+        self.addAsyncCleanup(self.orchestrator.close)
+
+        async def diagnose(description: str) -> Dict[str, Any]:
+            code = next(code for code in _SOLUTIONS if code in description)
+            return {"solutions": [_SOLUTIONS[code]]}
+
+        for patcher in (
+            mock.patch.object(
+                self.orchestrator.router_agent,
+                "process",
+                mock.AsyncMock(return_value=_TECHNICAL_ROUTE),
+            ),
+            mock.patch.object(
+                self.orchestrator.technical_agent, "_call_diagnostic_api", diagnose
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_queries_with_different_error_codes_miss(self):
+        first, second = (_ERROR_QUERY.format(code) for code in _SOLUTIONS)
+        # Close enough that only the number check keeps them apart
+        distance = 1 - float(np.dot(*_embed([first, second])))
+        self.assertLess(distance, 0.05)
+
+        # Separate conversations, so both are standalone first turns
+        responses: List[str] = []
+        for conversation_id, query in enumerate((first, second)):
+            result = await self.orchestrator.process_query(query, str(conversation_id))
+            responses.append(result["response"])
+
+        self.assertIn(_SOLUTIONS["E1234"], responses[0])
+        self.assertIn(_SOLUTIONS["E5678"], responses[1])
+        self.assertEqual(self.query_cache.rows, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
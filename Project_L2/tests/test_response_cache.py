@@ -0,0 +1,122 @@
+"""Unit tests for the semantic tier of CachedLLMUtils.
+
+Run from Project_L2 with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+import zlib
+from collections import Counter
+from typing import Any, Dict, List
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agent_implementations import CachedLLMUtils, LLMUtils  # noqa: E402
+
+_DIMENSIONS = 256
+
+_ORDER_QUERY = (
+    "Hi, I placed an order last week and would like to know the current "
+    "shipping status of order {}. Could you check it for me please?"
+)
+_ERROR_QUERY = (
+    "I keep getting error {} when I open the desktop app after the latest "
+    "update, how do I fix it?"
+)
+
+
+def _embed(texts: List[str]) -> List[List[float]]:
+    """Normalized character-trigram counts: texts differing in a few
+    characters land close together, like a real sentence embedding"""
+    embeddings = []
+    for text in texts:
+        vector = np.zeros(_DIMENSIONS)
+        counts = Counter(text[i : i + 3] for i in range(len(text) - 2))
+        for trigram, count in counts.items():
+            vector[zlib.crc32(trigram.encode()) % _DIMENSIONS] += count
+        embeddings.append((vector / np.linalg.norm(vector)).tolist())
+    return embeddings
+
+
+class _FakeCollection:
+    """In-memory stand-in for the Chroma response cache collection"""
+
+    def __init__(self):
+        self.rows: Dict[str, Any] = {}
+
+    def query(self, query_embeddings, n_results, where):
+        matches = sorted(
+            (1 - float(np.dot(embedding, query_embeddings[0])), document)
+            for embedding, document, metadata in self.rows.values()
+            if metadata == where
+        )[:n_results]
+        return {
+            "distances": [[distance for distance, _ in matches]],
+            "documents": [[document for _, document in matches]],
+        }
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.rows[ids[0]] = (embeddings[0], documents[0], metadatas[0])
+
+
+class SemanticCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.prompts: List[str] = []
+
+        def generate(llm, prompt, system_prompt, cache_query=None):
+            self.prompts.append(prompt)
+            return f"answer {len(self.prompts)}"
+
+        patcher = mock.patch.object(LLMUtils, "_generate", generate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.collection = _FakeCollection()
+        self.llm = CachedLLMUtils(
+            "http://ollama", "model", self.collection, embedding_function=_embed
+        )
+
+    def _ask(self, query: str) -> str:
+        prompt = f"Customer query: {query}\n\nPlease provide a helpful response."
+        return self.llm.generate_response(prompt, "system", cache_query=query)
+
+    def test_similar_queries_share_an_answer(self):
+        first = self._ask("What plans do you offer for small teams?")
+        second = self._ask("What plans do you offer for small teams ?")
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.prompts), 1)
+
+    def test_queries_with_different_ids_miss(self):
+        pairs = [
+            (template.format(first), template.format(second))
+            for template, first, second in (
+                (_ORDER_QUERY, "ORD-12345", "ORD-56789"),
+                (_ERROR_QUERY, "E1234", "E5678"),
+            )
+        ]
+        for first, second in pairs:
+            # Close enough that only the ID check keeps them apart
+            distance = 1 - float(np.dot(*_embed([first, second])))
+            self.assertLess(distance, self.llm.distance_threshold)
+
+            self.assertNotEqual(self._ask(first), self._ask(second))
+
+        self.assertEqual(len(self.prompts), 4)
+        self.assertEqual(self.collection.rows, {})
+
+    def test_prompts_without_cache_query_skip_semantic_tier(self):
+        for order_id in ("ORD-12345", "ORD-56789"):
+            prompt = f"Customer query: where is my order\n\nOrder: {order_id}"
+            self.llm.generate_response(prompt, "system")
+
+        self.assertEqual(len(self.prompts), 2)
+        self.assertEqual(self.collection.rows, {})
+
+
+if __name__ == "__main__":
+    unittest.main()